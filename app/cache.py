@@ -0,0 +1,156 @@
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Hashable
+from . import serializers
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+def make_key(query_set_name: str, query_type: str, node_type: str | None, params: dict, version: Any = None) -> tuple:
+    """
+    Builds a hashable cache key from a query request.
+
+    Parameter values are stringified so that "10" from a query string and
+    10 from a default map to the same entry, and None-valued parameters are
+    dropped so that an absent text search equals an explicit null one.
+    """
+    normalized = tuple(sorted((k, str(v)) for k, v in params.items() if v is not None))
+    return (query_set_name, query_type, node_type, normalized, version)
+
+class CacheBackend(ABC):
+    """
+    Interface for result caches. Keys are tuples whose first element is the
+    query set name, so a backend can invalidate one set at a time.
+    """
+
+    @abstractmethod
+    def get(self, key: Hashable) -> Any | None:
+        """Returns the cached value, or None on a miss or an expired entry."""
+
+    @abstractmethod
+    def set(self, key: Hashable, value: Any, ttl: float) -> None:
+        """Stores a value for `ttl` seconds."""
+
+    @abstractmethod
+    def invalidate(self, query_set_name: str | None = None) -> int:
+        """Drops every entry (or only those of one query set) and returns how many were removed."""
+
+    @abstractmethod
+    def stats(self) -> dict:
+        """Returns hit/miss counters and current occupancy."""
+
+class InMemoryCache(CacheBackend):
+    """
+    A bounded, thread-safe TTL + LRU cache.
+
+    Entries are evicted least-recently-used first once either the entry count
+    or the estimated payload size exceeds its limit. Sizes are estimated from
+    the JSON encoding of the value, which is what the API eventually sends.
+    """
+
+    def __init__(self, max_bytes: int, max_entries: int):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._entries: OrderedDict[Hashable, tuple[Any, float, int]] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Any | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires_at, size = entry
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: float) -> None:
+        if ttl <= 0:
+            return
+        size = self._estimate_size(value)
+        if size > self.max_bytes:
+            logger.debug(f"Not caching a {size}-byte result; it exceeds the cache size limit.")
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, time.monotonic() + ttl, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes or len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate(self, query_set_name: str | None = None) -> int:
+        with self._lock:
+            if query_set_name is None:
+                removed = len(self._entries)
+                self._entries.clear()
+                self._bytes = 0
+                return removed
+            keys = [k for k in self._entries if isinstance(k, tuple) and k and k[0] == query_set_name]
+            for key in keys:
+                self._remove(key)
+            return len(keys)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "backend": type(self).__name__,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": (self.hits / lookups) if lookups else 0.0,
+            }
+
+    def _remove(self, key: Hashable) -> None:
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+
+    def _estimate_size(self, value: Any) -> int:
+        try:
+            return len(serializers.dumps(value))
+        except (TypeError, ValueError):
+            return self.max_bytes + 1
+
+_cache: CacheBackend | None = None
+_properties_cache: CacheBackend | None = None
+_layout_cache: CacheBackend | None = None
+
+def get_cache() -> CacheBackend:
+    """Returns the singleton result cache, creating it if necessary."""
+    global _cache
+    if _cache is None:
+        _cache = InMemoryCache(settings.cache_max_bytes, settings.cache_max_entries)
+    return _cache
+
+def get_properties_cache() -> CacheBackend:
+    """Returns the singleton node/edge properties cache, keyed by (kind, element ID)."""
+    global _properties_cache
+    if _properties_cache is None:
+        _properties_cache = InMemoryCache(settings.properties_cache_max_bytes, settings.properties_cache_max_entries)
+    return _properties_cache
+
+def get_layout_cache() -> CacheBackend:
+    """Returns the singleton cache of computed node positions, keyed by graph structure."""
+    global _layout_cache
+    if _layout_cache is None:
+        _layout_cache = InMemoryCache(settings.layout_cache_max_bytes, settings.layout_cache_max_entries)
+    return _layout_cache
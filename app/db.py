@@ -1,37 +1,62 @@
 # app/db.py
+import asyncio
 import logging
-from neo4j import GraphDatabase, Driver
+from neo4j import READ_ACCESS, AsyncGraphDatabase, AsyncDriver
 from .config import settings
 
 logger = logging.getLogger(__name__)
 
-_driver: Driver | None = None
+_driver: AsyncDriver | None = None
 
-def get_driver() -> Driver:
+async def get_driver() -> AsyncDriver:
     """
-    Returns the singleton Neo4j driver instance, creating it if necessary.
+    Returns the singleton async Neo4j driver instance, creating it if necessary.
     """
     global _driver
     if _driver is None:
         logger.info(f"Initializing Neo4j driver for database '{settings.neo4j_database}'...")
         try:
             # Add the database parameter to the driver connection
-            _driver = GraphDatabase.driver(
+            driver = AsyncGraphDatabase.driver(
                 settings.neo4j_uri,
                 auth=(settings.neo4j_user, settings.neo4j_password),
-                database=settings.neo4j_database
+                database=settings.neo4j_database,
+                max_connection_pool_size=settings.neo4j_max_connection_pool_size,
+                connection_acquisition_timeout=settings.neo4j_connection_acquisition_timeout,
+                max_connection_lifetime=settings.neo4j_max_connection_lifetime,
+                fetch_size=settings.neo4j_fetch_size,
             )
-            _driver.verify_connectivity()
+            await driver.verify_connectivity()
+            _driver = driver
             logger.info("Neo4j driver initialized successfully.")
         except Exception as e:
             logger.error("Failed to initialize Neo4j driver.", exc_info=True)
             raise
     return _driver
 
-def close_driver():
+async def warm_pool(size: int | None = None):
+    """
+    Opens `size` connections concurrently so the first requests after startup
+    do not pay the connection handshake cost.
+    """
+    size = settings.neo4j_pool_warmup_size if size is None else size
+    size = min(size, settings.neo4j_max_connection_pool_size)
+    if size <= 0:
+        return
+    driver = await get_driver()
+
+    async def ping():
+        async with driver.session(default_access_mode=READ_ACCESS) as session:
+            result = await session.run("RETURN 1")
+            await result.consume()
+
+    logger.info(f"Pre-warming Neo4j connection pool with {size} connection(s).")
+    await asyncio.gather(*(ping() for _ in range(size)))
+
+async def close_driver():
     """Closes the Neo4j driver connection."""
     global _driver
     if _driver:
         logger.info("Closing Neo4j driver.")
-        _driver.close()
-        _driver = None
\ No newline at end of file
+        await _driver.close()
+        _driver = None
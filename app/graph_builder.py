@@ -0,0 +1,202 @@
+from neo4j import Record
+
+NODE, REL, OTHER = "node", "rel", "other"
+
+# A map column with this name holds computed, per-result properties (e.g.
+# aggregates and captions) that are merged over the result node's own
+# properties, so queries do not have to SET them on shared nodes.
+OVERLAY_COLUMN = "overlay"
+
+# Record subclasses tuple but overrides __getitem__ to also accept keys, which
+# makes positional access several times slower. Columns are resolved to
+# positions once, so the builder indexes the underlying tuple directly.
+_getitem = tuple.__getitem__
+
+def _prop(entity, overlay: dict | None, name: str):
+    """Reads a property from the overlay if it defines it, else from the node or relationship."""
+    if overlay is not None and name in overlay:
+        return overlay[name]
+    return entity.get(name)
+
+def _is_stored(rel) -> bool:
+    """
+    Whether a relationship is stored in the database. Stored element IDs have
+    the form "<n>:<database>:<id>"; virtual relationships (e.g. from
+    apoc.create.vRelationship) have other IDs, which change on every run.
+    """
+    return ":" in rel.element_id
+
+class GraphBuilder:
+    """
+    Converts query results into Cytoscape elements.
+
+    A builder is compiled once per query set from its `mapping` and
+    `caption_property`, so the per-record loop only does attribute lookups
+    that actually vary. Column roles (node, rel, other) are worked out once
+    per result instead of probing every value of every record.
+
+    If a result has an `overlay` column, its map applies to the record's
+    result node: the last node column of a primary record, or the child of a
+    neighbor record. Overlay values win over node properties for caption and
+    size, over relationship properties for edge weight, and are passed on to
+    the frontend as the node's `overlay` data.
+    """
+
+    def __init__(self, mapping: dict, caption_property: str):
+        self.caption_property = caption_property
+        self.node_size_prop = mapping.get("node_size")
+        self.node_community_prop = mapping.get("node_community")
+        self.edge_weight_prop = mapping.get("edge_weight")
+        self._label_cache: dict[frozenset, str] = {}
+
+    def build(self, records: list[Record], query_type: str, clicked_synthetic_id: str | None = None, parent_column: str | None = None) -> list[dict]:
+        """
+        Returns nodes, then edges, then compound (community) nodes.
+
+        Neighbor edges start at `clicked_synthetic_id`, or, for batched
+        multi-parent results, at the synthetic ID found in `parent_column`.
+        """
+        if not records:
+            return []
+        node_cols, rel_col = self._column_roles(records)
+        keys = records[0].keys()
+        overlay_col = keys.index(OVERLAY_COLUMN) if OVERLAY_COLUMN in keys else None
+        if query_type == "neighbors":
+            parent_col = keys.index(parent_column) if parent_column else None
+            nodes, edges = self._build_neighbors(records, node_cols, rel_col, clicked_synthetic_id, parent_col, overlay_col)
+            parent_nodes = ()
+        else:
+            nodes, parent_nodes = self._build_primary(records, node_cols, overlay_col)
+            edges = {}
+        compound_nodes = [{"data": {"id": pid}} for pid in parent_nodes]
+        return list(nodes.values()) + list(edges.values()) + compound_nodes
+
+    def _column_roles(self, records: list[Record]) -> tuple[list[int], int | None]:
+        """
+        Classifies each column from its first non-null value. Usually the first
+        record settles every column; later records are only looked at for
+        columns that were null so far (e.g. from an OPTIONAL MATCH).
+        """
+        width = len(records[0])
+        roles: list[str | None] = [None] * width
+        pending = width
+        for record in records:
+            for i in range(width):
+                if roles[i] is None:
+                    value = _getitem(record, i)
+                    if value is None:
+                        continue
+                    if hasattr(value, 'start_node'):
+                        roles[i] = REL
+                    elif hasattr(value, 'labels'):
+                        roles[i] = NODE
+                    else:
+                        roles[i] = OTHER
+                    pending -= 1
+            if not pending:
+                break
+        node_cols = [i for i, role in enumerate(roles) if role == NODE]
+        rel_cols = [i for i, role in enumerate(roles) if role == REL]
+        return node_cols, (rel_cols[-1] if rel_cols else None)
+
+    def _label_of(self, node) -> str:
+        labels = node.labels
+        label = self._label_cache.get(labels)
+        if label is None:
+            label = self._label_cache[labels] = next(iter(labels), "Node")
+        return label
+
+    def _node_data(self, node, node_id: str, overlay: dict | None = None) -> dict:
+        node_label = self._label_of(node)
+        caption = _prop(node, overlay, self.caption_property)
+        if caption is None:
+            caption = _prop(node, overlay, "name")
+            if caption is None:
+                caption = node_label
+        node_data = {
+            "id": node_id,
+            "label": node_label,
+            "name": caption,
+            "original_element_id": node.element_id
+        }
+        if self.node_size_prop:
+            size = _prop(node, overlay, self.node_size_prop)
+            if size is not None:
+                node_data["size"] = size
+        if overlay:
+            node_data["overlay"] = overlay
+        return node_data
+
+    def _build_primary(self, records: list[Record], node_cols: list[int], overlay_col: int | None = None) -> tuple[dict, set]:
+        nodes, parent_nodes = {}, set()
+        community_prop = self.node_community_prop
+        result_col = node_cols[-1] if node_cols else None
+        getitem = _getitem
+        for record in records:
+            for i in node_cols:
+                node = getitem(record, i)
+                if node is None:
+                    continue
+                node_id = node.element_id
+                if node_id in nodes:
+                    continue
+                overlay = getitem(record, overlay_col) if overlay_col is not None and i == result_col else None
+                node_data = self._node_data(node, node_id, overlay)
+                if community_prop:
+                    community = _prop(node, overlay, community_prop)
+                    if community is not None:
+                        community_id = str(community)
+                        node_data["parent"] = community_id
+                        parent_nodes.add(community_id)
+                nodes[node_id] = {"data": node_data}
+        return nodes, parent_nodes
+
+    def _build_neighbors(self, records: list[Record], node_cols: list[int], rel_col: int | None, parent_id: str | None, parent_col: int | None = None, overlay_col: int | None = None) -> tuple[dict, dict]:
+        nodes, edges = {}, {}
+        if rel_col is None:
+            return nodes, edges
+        weight_prop = self.edge_weight_prop
+        getitem = _getitem
+        child_col = None
+        for record in records:
+            rel = getitem(record, rel_col)
+            if rel is None:
+                continue
+            end_id = rel.end_node.element_id
+            # The child column is the node column holding the relationship's end
+            # node; find it once and only search again if a record disagrees.
+            child = getitem(record, child_col) if child_col is not None else None
+            if child is None or child.element_id != end_id:
+                child_col = next((i for i in node_cols if record[i] is not None and record[i].element_id == end_id), None)
+                if child_col is None:
+                    continue
+                child = getitem(record, child_col)
+
+            if parent_col is not None:
+                parent_id = getitem(record, parent_col)
+            # Create a NEW, UNIQUE ID for the child node to force a "tree" structure
+            # This prevents collisions if the same child node is reached via different paths.
+            # IDs are built from the path (parent's synthetic ID, then element IDs), not from
+            # the relationship: virtual relationships get a new ID on every run, and stable
+            # IDs let unchanged results keep their ETag and deltas match elements up.
+            unique_child_id = f"{parent_id}_{end_id}"
+            edge_id = f"{parent_id}-{rel.type}->{end_id}"
+            overlay = getitem(record, overlay_col) if overlay_col is not None else None
+            if unique_child_id not in nodes:
+                nodes[unique_child_id] = {"data": self._node_data(child, unique_child_id, overlay)}
+
+            if edge_id not in edges:
+                edge_data = {
+                    "id": edge_id,
+                    "source": parent_id, # <-- Parent's synthetic ID
+                    "target": unique_child_id, # <-- Child's synthetic ID
+                    "label": rel.type
+                }
+                if _is_stored(rel):
+                    edge_data["original_element_id"] = rel.element_id
+                if weight_prop:
+                    weight = _prop(rel, overlay, weight_prop)
+                    if weight is not None:
+                        edge_data["weight"] = weight
+                edges[edge_id] = {"data": edge_data}
+        return nodes, edges
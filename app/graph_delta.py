@@ -0,0 +1,93 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from .config import settings
+
+def etag(body: bytes) -> str:
+    """Returns a strong ETag computed from the encoded response body."""
+    return f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+_CODINGS = ("gzip", "br")
+
+def with_coding(tag: str, coding: str | None) -> str:
+    """The ETag of a compressed body: each content coding is a separate representation."""
+    return f'{tag[:-1]}-{coding}"' if coding else tag
+
+def without_coding(tag: str) -> str:
+    """The ETag of the uncompressed body behind a with_coding() ETag."""
+    for coding in _CODINGS:
+        if tag.endswith(f'-{coding}"'):
+            return f'{tag[:-len(coding) - 2]}"'
+    return tag
+
+def matches(if_none_match: str | None, tag: str) -> bool:
+    """Whether an If-None-Match header value (a list of ETags, or "*") matches `tag` in any content coding."""
+    if not if_none_match:
+        return False
+    candidates = [c.strip() for c in if_none_match.split(",")]
+    # If-None-Match uses the weak comparison, so a W/ prefix is ignored.
+    return "*" in candidates or any(without_coding(c.removeprefix("W/")) == tag for c in candidates)
+
+def diff(base: list[dict], current: list[dict]) -> dict:
+    """
+    Compares two lists of Cytoscape elements by ID: elements only in
+    `current` are added, elements whose data changed are updated (sent in
+    full), and the IDs of elements only in `base` are removed.
+    """
+    base_by_id = {element["data"]["id"]: element for element in base}
+    added, updated, seen = [], [], set()
+    for element in current:
+        element_id = element["data"]["id"]
+        seen.add(element_id)
+        previous = base_by_id.get(element_id)
+        if previous is None:
+            added.append(element)
+        elif previous != element:
+            updated.append(element)
+    removed = [element_id for element_id in base_by_id if element_id not in seen]
+    return {"added": added, "updated": updated, "removed": removed}
+
+class GraphVersions:
+    """
+    A bounded, thread-safe LRU of recently sent graphs, keyed by the ETag of
+    the response they were sent in, so a later response can be sent as a
+    delta against one of them. Sizes are the encoded sizes of those
+    responses, which the caller already knows.
+    """
+
+    def __init__(self, max_bytes: int, max_entries: int):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[list[dict], int]] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, tag: str) -> list[dict] | None:
+        with self._lock:
+            entry = self._entries.get(tag)
+            if entry is None:
+                return None
+            self._entries.move_to_end(tag)
+            return entry[0]
+
+    def set(self, tag: str, elements: list[dict], size: int) -> None:
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if tag in self._entries:
+                self._entries.move_to_end(tag)
+                return
+            self._entries[tag] = (elements, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes or len(self._entries) > self.max_entries:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+
+_versions: GraphVersions | None = None
+
+def get_graph_versions() -> GraphVersions:
+    """Returns the singleton store of recently sent graphs, creating it if necessary."""
+    global _versions
+    if _versions is None:
+        _versions = GraphVersions(settings.graph_versions_max_bytes, settings.graph_versions_max_entries)
+    return _versions
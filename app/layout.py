@@ -0,0 +1,180 @@
+import hashlib
+from collections import defaultdict
+from . import metrics
+from .cache import get_layout_cache
+from .config import settings
+from .singleflight import ThreadSingleFlight
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is only needed when server-side layout is enabled.
+    np = None
+
+# Distances between tree levels and between neighboring nodes (also the
+# ideal edge length of the force-directed layout), in Cytoscape model units.
+LEVEL_SPACING = 180.0
+NODE_SPACING = 60.0
+
+# Requests for the same structure that arrive while it is being laid out
+# (layouts run in worker threads) wait for that layout.
+_flights = ThreadSingleFlight()
+
+def _compute(nodes: list[str], edges: list[tuple[str, str]], parents: dict[str, str], anchor: str | None) -> dict[str, dict]:
+    if anchor is not None:
+        positions = tree_layout(nodes, edges, anchor)
+        positions.pop(anchor, None)
+    else:
+        positions = force_layout(nodes, edges, parents)
+    return {node: {"x": round(x, 1), "y": round(y, 1)} for node, (x, y) in positions.items()}
+
+def _structure(elements: list[dict], anchor: str | None) -> tuple[list[str], list[tuple[str, str]], dict[str, str]]:
+    """
+    Returns the IDs of the positionable nodes, the edges between them (and
+    from `anchor`, which drill-down results do not include), and each node's
+    compound parent.
+    """
+    compound = {e["data"]["parent"] for e in elements if "parent" in e["data"]}
+    nodes = [e["data"]["id"] for e in elements if "source" not in e["data"] and e["data"]["id"] not in compound]
+    known = set(nodes) | {anchor}
+    edges = [(e["data"]["source"], e["data"]["target"]) for e in elements
+             if "source" in e["data"] and e["data"]["source"] in known and e["data"]["target"] in known]
+    parents = {e["data"]["id"]: e["data"]["parent"] for e in elements if "parent" in e["data"]}
+    return nodes, edges, parents
+
+def _key(nodes: list[str], edges: list[tuple[str, str]], parents: dict[str, str], anchor: str | None) -> str:
+    """Hashes the structure the positions depend on; data such as captions or sizes does not move nodes."""
+    digest = hashlib.blake2b(digest_size=16)
+    for part in (anchor or "", "\0".join(nodes), "\0".join(f"{s}\1{t}" for s, t in edges),
+                 "\0".join(f"{n}\1{p}" for n, p in sorted(parents.items()))):
+        digest.update(part.encode())
+        digest.update(b"\2")
+    return digest.hexdigest()
+
+def tree_layout(nodes: list[str], edges: list[tuple[str, str]], anchor: str | None) -> dict[str, tuple[float, float]]:
+    """
+    Lays out a forest left to right: a node's x is its depth, leaves get
+    consecutive rows and a parent is centered on its children. The tree of
+    `anchor` comes first and is placed with the anchor at the origin, so the
+    positions can be offset by wherever the anchor already is. The anchor
+    need not be one of `nodes`.
+    """
+    if anchor is not None and anchor not in nodes:
+        nodes = [anchor, *nodes]
+    children, has_parent = defaultdict(list), set()
+    for source, target in edges:
+        if target not in has_parent and target != source:
+            children[source].append(target)
+            has_parent.add(target)
+    roots = [n for n in nodes if n not in has_parent]
+    if anchor in has_parent:
+        anchor = None
+    if anchor is not None:
+        roots.remove(anchor)
+        roots.insert(0, anchor)
+
+    positions, next_row, seen = {}, 0, set()
+    for root in roots:
+        # Iterative post-order walk: a node is pushed once to push its
+        # children, and again (done=True) to be placed after them.
+        stack = [(False, root, 0)]
+        while stack:
+            done, node, depth = stack.pop()
+            if done:
+                placed = [positions[c][1] for c in children[node] if c in positions]
+                if placed:
+                    y = (placed[0] + placed[-1]) / 2
+                else:
+                    y, next_row = next_row * NODE_SPACING, next_row + 1
+                positions[node] = (depth * LEVEL_SPACING, y)
+            elif node not in seen:
+                seen.add(node)
+                stack.append((True, node, depth))
+                stack.extend((False, c, depth + 1) for c in reversed(children[node]))
+    if anchor is not None:
+        ax, ay = positions[anchor]
+        positions = {n: (x - ax, y - ay) for n, (x, y) in positions.items()}
+    return positions
+
+def force_layout(nodes: list[str], edges: list[tuple[str, str]], parents: dict[str, str]) -> dict[str, tuple[float, float]]:
+    """
+    A vectorized Fruchterman-Reingold layout: all pairs repel, edges attract,
+    nodes of the same compound (community) node are pulled towards their
+    centroid and a weak gravity keeps disconnected parts together. Starts
+    from a fixed seed, so the same structure always gets the same layout.
+    """
+    n = len(nodes)
+    index = {node: i for i, node in enumerate(nodes)}
+    source = np.array([index[s] for s, _ in edges], dtype=np.intp)
+    target = np.array([index[t] for _, t in edges], dtype=np.intp)
+    group_ids = {p: i for i, p in enumerate(dict.fromkeys(parents.get(node) for node in nodes if node in parents))}
+    groups = np.array([group_ids.get(parents.get(node), -1) for node in nodes], dtype=np.intp)
+    grouped = groups >= 0
+
+    k = NODE_SPACING
+    rng = np.random.default_rng(0)
+    radius = k * np.sqrt(n)
+    pos = (rng.random((n, 2)) - 0.5) * radius
+    temperature = radius / 4
+    cooling = 0.01 ** (1 / max(settings.layout_iterations, 1))
+    diagonal = np.arange(n)
+    # The two n x n buffers are reused by every iteration; single precision
+    # halves their size and the time spent on them.
+    dist2 = np.empty((n, n), dtype=np.float32)
+    dy2 = np.empty((n, n), dtype=np.float32)
+    for _ in range(settings.layout_iterations):
+        x, y = pos[:, 0].astype(np.float32), pos[:, 1].astype(np.float32)
+        np.subtract.outer(x, x, out=dist2)
+        np.square(dist2, out=dist2)
+        np.subtract.outer(y, y, out=dy2)
+        np.square(dy2, out=dy2)
+        dist2 += dy2
+        np.maximum(dist2, 1e-2, out=dist2)
+        # Repulsion k^2/d along the unit vector (p_i - p_j)/d, i.e. f_ij (p_i - p_j)
+        # with f = k^2/d^2; summed over j that is p_i * sum(f_i) - (f @ p)_i.
+        force = np.divide(np.float32(k * k), dist2, out=dist2)
+        force[diagonal, diagonal] = 0.0
+        disp = pos * force.sum(axis=1, dtype=np.float64)[:, None] - (force @ pos.astype(np.float32))
+        if len(source):
+            # Attraction d^2/k along the edge, i.e. delta * d/k.
+            edge = pos[source] - pos[target]
+            pull = edge * (np.linalg.norm(edge, axis=1) / k)[:, None]
+            np.add.at(disp, source, -pull)
+            np.add.at(disp, target, pull)
+        if grouped.any():
+            centroids = np.zeros((len(group_ids), 2))
+            np.add.at(centroids, groups[grouped], pos[grouped])
+            centroids /= np.bincount(groups[grouped], minlength=len(group_ids))[:, None]
+            offset = pos[grouped] - centroids[groups[grouped]]
+            disp[grouped] -= offset * (np.linalg.norm(offset, axis=1) / k)[:, None]
+        disp -= pos * (np.linalg.norm(pos, axis=1) / (k * n))[:, None]
+        length = np.maximum(np.linalg.norm(disp, axis=1), 1e-6)
+        pos += disp * (np.minimum(length, temperature) / length)[:, None]
+        temperature *= cooling
+    pos -= pos.mean(axis=0)
+    return {node: (float(x), float(y)) for node, (x, y) in zip(nodes, pos)}
+
+def apply(elements: list[dict], anchor: str | None = None, query_set: str = "unknown") -> list[dict]:
+    """
+    Sets `position` on the nodes of a Cytoscape element list (compound
+    nodes are sized by Cytoscape from their children). Drill-down results,
+    given the clicked node as `anchor`, are laid out as a tree relative to
+    it; other results with the force-directed layout. Positions are cached
+    by graph structure, so a repeated result is not laid out again, and
+    concurrent requests for the same structure share one layout. Results
+    for the force-directed layout with more than LAYOUT_MAX_NODES nodes are
+    left without positions; tree layouts are linear and always computed.
+    """
+    nodes, edges, parents = _structure(elements, anchor)
+    if not nodes or (anchor is None and len(nodes) > settings.layout_max_nodes):
+        return elements
+    cache = get_layout_cache()
+    key = ("layout", _key(nodes, edges, parents, anchor))
+    positions = cache.get(key)
+    if positions is None:
+        positions, shared = _flights.do(key, lambda: _compute(nodes, edges, parents, anchor))
+        if shared:
+            metrics.coalesced_executions_total.inc(query_set, "layout")
+        else:
+            cache.set(key, positions, settings.layout_cache_ttl)
+    return [{**e, "position": positions[e["data"]["id"]]} if e["data"]["id"] in positions and "source" not in e["data"] else e
+            for e in elements]
@@ -1,9 +1,18 @@
+import asyncio
+import json
 import logging
+from dataclasses import asdict
+from contextlib import AsyncExitStack, asynccontextmanager
 from fastapi import FastAPI, Depends, HTTPException, Request
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+from pydantic import BaseModel
 from fastapi.templating import Jinja2Templates
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
-from . import db, repository
+from . import db, graph_delta, metrics, offload, query_plans, repository, serializers, wire_format
+from .cache import get_cache, get_properties_cache
+from .query_registry import get_registry
+from .rollup import get_rollup_engine
 from .config import settings
 
 logging.basicConfig(
@@ -12,7 +21,66 @@ logging.basicConfig(
     datefmt="%Y-%m-%d %H:%M:%S",
 )
 logger = logging.getLogger(__name__)
-app = FastAPI()
+
+async def _inspect_plans(app: FastAPI, driver):
+    """Plans every query in the background, then marks the app ready."""
+    try:
+        await query_plans.inspect_queries(driver, get_registry().current())
+    except Exception:
+        logger.error("Startup plan inspection failed.", exc_info=True)
+    finally:
+        app.state.ready = True
+
+async def _load_rollup(driver):
+    """
+    Loads the rollup engine, then drops the cached results of the query sets
+    it answers, which were computed from the previous facts.
+    """
+    await get_rollup_engine().load(driver)
+    cache = get_cache()
+    for name, details in get_registry().current().query_sets.items():
+        if details.get("rollup"):
+            cache.invalidate(name)
+
+async def _refresh_rollup(driver):
+    """Loads the rollup engine, then reloads it every ROLLUP_REFRESH_INTERVAL seconds."""
+    while True:
+        try:
+            await _load_rollup(driver)
+        except Exception:
+            logger.error("Loading the rollup engine failed; rollup query sets keep using Cypher.", exc_info=True)
+        if settings.rollup_refresh_interval <= 0:
+            return
+        await asyncio.sleep(settings.rollup_refresh_interval)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Loads the query sets and pre-warms the driver pool on startup; closes the
+    driver on shutdown. If enabled, every query is planned with EXPLAIN in
+    the background and the app only reports ready once that has finished.
+    The rollup engine, if enabled and used by a query set, is loaded in the
+    background too; until then those query sets run their Cypher queries.
+    """
+    app.state.ready = False
+    get_registry().load()
+    driver = await db.get_driver()
+    await db.warm_pool()
+    inspection = None
+    if settings.explain_queries_on_startup:
+        inspection = asyncio.create_task(_inspect_plans(app, driver))
+    else:
+        app.state.ready = True
+    rollup = None
+    if settings.rollup_enabled and any(d.get("rollup") for d in get_registry().current().query_sets.values()):
+        rollup = asyncio.create_task(_refresh_rollup(driver))
+    yield
+    for task in (inspection, rollup):
+        if task is not None:
+            task.cancel()
+    await db.close_driver()
+
+app = FastAPI(lifespan=lifespan, default_response_class=serializers.ORJSONResponse)
 
 app.mount("/static", StaticFiles(directory="app/static"), name="static")
 templates = Jinja2Templates(directory="app/templates")
@@ -25,29 +93,105 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-@app.on_event("startup")
-def startup_event():
-    """Initializes the database driver on application startup."""
-    db.get_driver()
+class _ClosingStreamingResponse(StreamingResponse):
+    """
+    A streaming response that closes `stack` (e.g. the Neo4j session the
+    body is read from) once it has been sent or has failed. The body
+    generator's own cleanup is not enough: if the client disconnects or the
+    send fails before Starlette starts iterating the body, it never runs.
+    """
+
+    def __init__(self, content, stack: AsyncExitStack, **kwargs):
+        super().__init__(content, **kwargs)
+        self.stack = stack
 
-@app.on_event("shutdown")
-def shutdown_event():
-    """Closes the database driver on application shutdown."""
-    db.close_driver()
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            # Runs the generator's cleanup if it was cut short; a no-op once it has finished.
+            await self.body_iterator.aclose()
+            await self.stack.aclose()
 
-def get_repo():
+async def get_repo():
     """Dependency injection function to get a GraphRepository instance."""
-    return repository.GraphRepository(db.get_driver())
+    return repository.GraphRepository(await db.get_driver())
+
+def _size(content: dict) -> int:
+    """The number of graph elements and table rows in a response payload, which its encoding time scales with."""
+    graph = content.get("graph") or content.get("delta", {}).get("added", [])
+    table = content.get("table") or {}
+    return len(graph) + len(content.get("records") or table.get("records") or [])
+
+def _encode(content: dict, format: str) -> tuple[bytes, str, str]:
+    """Encodes a payload and computes the ETag of the encoded body."""
+    body, media_type = wire_format.encode(content, format)
+    return body, media_type, graph_delta.etag(body)
+
+async def _send(request: Request, body: bytes, media_type: str, headers: dict, query_set: str, query_type: str) -> Response:
+    """
+    Compresses the body if it is large enough and the client accepts it
+    (an ETag then gets the content coding as a suffix), and records the
+    size sent.
+    """
+    coding = wire_format.content_coding(len(body), request.headers.get("accept-encoding"))
+    if coding is not None:
+        with metrics.timer(query_set, query_type, "compress"):
+            body = await offload.run(wire_format.compress, body, coding, size=len(body))
+        headers["Content-Encoding"] = coding
+        if "ETag" in headers:
+            headers["ETag"] = graph_delta.with_coding(headers["ETag"], coding)
+    metrics.response_bytes.observe(len(body), query_set, query_type)
+    return Response(body, media_type=media_type, headers={**headers, "Vary": "Accept, Accept-Encoding"})
+
+async def _json_response(request: Request, format: str, content, query_set: str, query_type: str) -> Response:
+    """Renders a response in the negotiated format (see app/wire_format.py), recording its encoding time and size."""
+    with metrics.timer(query_set, query_type, "encode"):
+        body, media_type = await offload.run(wire_format.encode, content, format, items=_size(content))
+    return await _send(request, body, media_type, {}, query_set, query_type)
+
+async def _graph_response(request: Request, format: str, delta_base: str | None, content: dict, query_set: str, query_type: str) -> Response:
+    """
+    Renders a graph payload in the negotiated format with a strong ETag
+    computed from its content (per format and content coding) and
+    `Cache-Control: private, no-cache`, so clients revalidate every time:
+
+    - If `If-None-Match` matches, the response is 304 Not Modified.
+    - If `delta_base` names the ETag of a graph still in the server's
+      version store, the `graph` list is replaced by a `delta` of elements
+      added, updated and removed since that graph.
+    - Otherwise the full payload is sent.
+    """
+    with metrics.timer(query_set, query_type, "encode"):
+        body, media_type, tag = await offload.run(_encode, content, format, items=_size(content))
+    headers = {"ETag": tag, "Cache-Control": "private, no-cache"}
+    if graph_delta.matches(request.headers.get("if-none-match"), tag):
+        metrics.conditional_responses_total.inc(query_set, query_type, "not_modified")
+        coding = wire_format.content_coding(len(body), request.headers.get("accept-encoding"))
+        headers["ETag"] = graph_delta.with_coding(tag, coding)
+        return Response(status_code=304, headers={**headers, "Vary": "Accept, Accept-Encoding"})
+
+    versions = graph_delta.get_graph_versions()
+    base = versions.get(graph_delta.without_coding(delta_base)) if delta_base else None
+    versions.set(tag, content["graph"], len(body))
+    if base is not None:
+        delta = {k: v for k, v in content.items() if k != "graph"}
+        changes = await offload.run(graph_delta.diff, base, content["graph"], items=len(content["graph"]))
+        delta["delta"] = {"base": delta_base, **changes}
+        with metrics.timer(query_set, query_type, "encode"):
+            body, media_type = await offload.run(wire_format.encode, delta, format, items=_size(delta))
+        metrics.conditional_responses_total.inc(query_set, query_type, "delta")
+    return await _send(request, body, media_type, headers, query_set, query_type)
 
 @app.get("/", include_in_schema=False)
-def serve_frontend(request: Request):
+async def serve_frontend(request: Request):
     """Serves the main index.html file."""
     return templates.TemplateResponse("index.html", {"request": request})
 
 # --- API Endpoints ---
 
 @app.get("/api/connection-info", summary="Get current connection info")
-def get_connection_info():
+async def get_connection_info():
     """Returns basic information about the current Neo4j connection."""
     return {
         "user_name": settings.neo4j_user,
@@ -55,7 +199,7 @@ def get_connection_info():
     }
 
 @app.get("/api/queries", summary="Get the list of available, enabled queries")
-def get_available_queries(repo: repository.GraphRepository = Depends(get_repo)):
+async def get_available_queries(repo: repository.GraphRepository = Depends(get_repo)):
     """Fetches the list of user-facing queries from the repository."""
     try:
         return repo.get_available_queries()
@@ -64,32 +208,56 @@ def get_available_queries(repo: repository.GraphRepository = Depends(get_repo)):
         raise HTTPException(status_code=500, detail="An internal server error occurred.")
 
 @app.get("/api/search/{query_set_name}", summary="Search the graph using a named query set")
-def search_graph_data(
+async def search_graph_data(
     query_set_name: str,
     request: Request,
     months: int = 1,
+    table: bool = True,
     repo: repository.GraphRepository = Depends(get_repo)
 ):
     """
     Runs a 'primary' search, fetching both graph data for visualization
-    and table data for the bottom panel.
+    and table data for the bottom panel. The two queries are sent
+    concurrently; pass table=false to skip the table query entirely.
+
+    For paginated query sets, `cursor` continues the graph results and
+    `table_cursor` the table rows; each part of the response carries its
+    own `next_cursor` and `has_more`.
+
+    Responses carry an ETag; see _graph_response for 304 and `delta_base`.
+    `format` (or the Accept header) selects the compact encodings of
+    app/wire_format.py.
     """
     try:
         params = dict(request.query_params)
+        params.pop("table", None)
+        delta_base = params.pop("delta_base", None)
+        wire = wire_format.negotiate(params.pop("format", None), request.headers.get("accept"))
+        table_cursor = params.pop("table_cursor", None)
         params["months"] = months
-        
-        # 1. Execute the graph query
-        graph_result = repo.execute_query(query_set_name, "primary", params)
-        
-        # 2. Get and execute the separate table query
-        table_query_string = repo.query_sets.get(query_set_name, {}).get("table_query")
-        table_result = repo.execute_table_query(table_query_string, params)
+        params.setdefault("limit", 10)
+        params.setdefault("text_search", None)
+
+        # 1. Execute the graph query and, unless skipped, the separate table query at the same time
+        graph_call = repo.execute_query(query_set_name, "primary", dict(params))
+        if table:
+            table_query_string = repo.query_sets.get(query_set_name, {}).get("table_query")
+            table_params = {k: v for k, v in params.items() if k != "cursor"}
+            if table_cursor:
+                table_params["cursor"] = table_cursor
+            table_call = repo.execute_table_query(table_query_string, table_params, query_set_name)
+            graph_result, table_result = await asyncio.gather(graph_call, table_call)
+        else:
+            graph_result = await graph_call
+            table_result = {"records": [], "keys": [], "next_cursor": None, "has_more": False}
 
-        # 3. Return a combined payload
-        return {
+        # 2. Return a combined payload
+        return await _graph_response(request, wire, delta_base, {
             "graph": graph_result["graph"],
+            "next_cursor": graph_result.get("next_cursor"),
+            "has_more": graph_result.get("has_more", False),
             "table": table_result
-        }
+        }, query_set_name, "primary")
         
     except ValueError as ve:
         raise HTTPException(status_code=400, detail=str(ve))
@@ -99,51 +267,139 @@ def search_graph_data(
         logger.error("An error occurred in the search graph endpoint.", exc_info=True)
         raise HTTPException(status_code=500, detail="An internal server error occurred.")
 
+@app.get("/api/search/{query_set_name}/table", summary="Get the table data of a named query set")
+async def search_table_data(
+    query_set_name: str,
+    request: Request,
+    months: int = 1,
+    format: str | None = None,
+    repo: repository.GraphRepository = Depends(get_repo)
+):
+    """
+    Runs only the table query of a query set. With format=ndjson the rows are
+    streamed as newline-delimited JSON while they are fetched from Neo4j, so
+    server memory stays flat regardless of the number of rows. The column
+    names are sent in the X-Table-Keys header.
+
+    For a paginated table query, `cursor` continues after a previous page
+    (the JSON format returns `next_cursor` and `has_more`).
+    """
+    if format not in (None, "ndjson", *wire_format.FORMATS):
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(wire_format.FORMATS)} or ndjson.")
+    stack = AsyncExitStack()
+    try:
+        params = dict(request.query_params)
+        params.pop("format", None)
+        params["months"] = months
+        params.setdefault("limit", 10)
+        params.setdefault("text_search", None)
+        table_query_string = repo.get_table_query(query_set_name)
+
+        if format != "ndjson":
+            wire = wire_format.negotiate(format, request.headers.get("accept"))
+            table = await repo.execute_table_query(table_query_string, params, query_set_name)
+            return await _json_response(request, wire, table, query_set_name, "table")
+
+        result = await stack.enter_async_context(repo.stream_table_query(table_query_string, params, query_set_name))
+        hidden = repo.hidden_table_key(query_set_name)
+        keys = [key for key in result.keys() if key != hidden]
+    except ValueError as ve:
+        await stack.aclose()
+        raise HTTPException(status_code=400, detail=str(ve))
+    except PermissionError as pe:
+        await stack.aclose()
+        raise HTTPException(status_code=403, detail=str(pe))
+    except Exception:
+        await stack.aclose()
+        logger.error("An error occurred in the search table endpoint.", exc_info=True)
+        raise HTTPException(status_code=500, detail="An internal server error occurred.")
+
+    async def ndjson_lines():
+        # The generator only pulls the next record once the previous line has
+        # been handed to the client, which gives end-to-end backpressure.
+        sent = 0
+        try:
+            async for record in result:
+                row = serializers.serialize_record(record)
+                if hidden is not None:
+                    row.pop(hidden, None)
+                line = serializers.dumps(row) + b"\n"
+                sent += len(line)
+                yield line
+        except Exception:
+            logger.error("An error occurred while streaming table rows.", exc_info=True)
+            raise
+        finally:
+            metrics.response_bytes.observe(sent, query_set_name, "table")
+            await stack.aclose()
+
+    return _ClosingStreamingResponse(
+        ndjson_lines(),
+        stack,
+        media_type="application/x-ndjson",
+        headers={"X-Table-Keys": json.dumps(keys)}
+    )
+
 @app.get("/api/nodes/{node_id}/neighbors", summary="Get neighbors of a specific node")
-def get_node_neighbors(
+async def get_node_neighbors(
     node_id: str,
     node_type: str, # node_type is now a required parameter
     request: Request,
     query_key: str | None = None,
+    depth: int = 1,
     repo: repository.GraphRepository = Depends(get_repo)
 ):
     """
     Executes the 'neighbors' query from the specified query_key,
     selecting the appropriate sub-query based on the node's type (label).
     
+    With depth > 1 the server keeps drilling down through the per-label
+    neighbor queries and returns all levels at once.
+    
     NOTE: This only returns graph data. The static table is NOT updated on drill-down.
+
+    Responses carry an ETag; see _graph_response for 304 and `delta_base`.
+    `format` (or the Accept header) selects the compact encodings of
+    app/wire_format.py.
     """
     try:
         params = dict(request.query_params)
+        delta_base = params.pop("delta_base", None)
+        wire = wire_format.negotiate(params.pop("format", None), request.headers.get("accept"))
         params["node_id"] = node_id
         params["node_type"] = node_type
+        params["depth"] = depth
         if query_key:
             params["query_key"] = query_key
         query_set = (query_key or dict(request.query_params).get("query_key") or "default_graph")
         
         # Neighbor query only returns graph data, so we call execute_query
-        graph_result = repo.execute_query(query_set, "neighbors", params)
+        graph_result = await repo.execute_query(query_set, "neighbors", params)
         
         # Return a payload compatible with the frontend
-        return {
+        return await _graph_response(request, wire, delta_base, {
             "graph": graph_result["graph"],
             "table": { # Return an empty table, as the static table doesn't change
                 "records": [],
                 "keys": []
             }
-        }
+        }, query_set, "neighbors")
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+    except PermissionError as pe:
+        raise HTTPException(status_code=403, detail=str(pe))
     except Exception:
         logger.error(f"An error occurred while fetching neighbors for node {node_id}.", exc_info=True)
         raise HTTPException(status_code=500, detail="An internal server error occurred.")
 
 @app.get("/api/nodes/{node_id}/properties", summary="Get properties of a specific node")
-def get_node_properties(
+async def get_node_properties(
     node_id: str,
     repo: repository.GraphRepository = Depends(get_repo)
 ):
     """Fetches the properties for a single node, given its element ID."""
     try:
-        properties = repo.get_node_properties(node_id)
+        properties = await repo.get_node_properties(node_id)
         if properties is None:
             raise HTTPException(status_code=404, detail="Node not found or has no properties.")
         return properties
@@ -155,13 +411,13 @@ def get_node_properties(
         raise e
 
 @app.get("/api/edges/{edge_id}/properties", summary="Get properties of a specific edge")
-def get_edge_properties(
+async def get_edge_properties(
     edge_id: str,
     repo: repository.GraphRepository = Depends(get_repo)
 ):
     """Fetches the properties for a single edge, given its element ID."""
     try:
-        properties = repo.get_edge_properties(edge_id)
+        properties = await repo.get_edge_properties(edge_id)
         if properties is None:
             raise HTTPException(status_code=404, detail="Edge not found or has no properties.")
         return properties
@@ -170,4 +426,92 @@ def get_edge_properties(
         if not isinstance(e, HTTPException):
             logger.error(f"An error occurred while fetching properties for edge {edge_id}.", exc_info=True)
             raise HTTPException(status_code=500, detail="An internal server error occurred.")
-        raise e
\ No newline at end of file
+        raise e
+
+class PropertiesBatchRequest(BaseModel):
+    """Element IDs to resolve; node IDs may be synthetic ("parentId_nodeId")."""
+    node_ids: list[str] = []
+    edge_ids: list[str] = []
+
+@app.post("/api/properties:batch", summary="Get properties of many nodes and edges")
+async def get_properties_batch(
+    body: PropertiesBatchRequest,
+    repo: repository.GraphRepository = Depends(get_repo)
+):
+    """
+    Resolves the properties of many nodes and edges in one call, e.g. to
+    prefetch a whole expanded neighborhood. IDs that do not resolve map to null.
+    """
+    if len(body.node_ids) + len(body.edge_ids) > settings.properties_batch_max_ids:
+        raise HTTPException(status_code=400, detail=f"At most {settings.properties_batch_max_ids} IDs can be requested at once.")
+    try:
+        return await repo.get_properties_batch(body.node_ids, body.edge_ids)
+    except Exception:
+        logger.error("An error occurred while fetching properties in batch.", exc_info=True)
+        raise HTTPException(status_code=500, detail="An internal server error occurred.")
+
+@app.get("/api/ready", summary="Readiness probe")
+async def get_readiness():
+    """Returns 200 once startup (including the optional plan warm-up) has finished, 503 before."""
+    if not app.state.ready:
+        return serializers.ORJSONResponse({"ready": False}, status_code=503)
+    return {"ready": True}
+
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """Exposes per-query-set phase latencies, response sizes and pool usage in the Prometheus text format."""
+    return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4")
+
+# --- Admin Endpoints ---
+
+@app.get("/api/admin/cache", summary="Get result cache statistics")
+async def get_cache_stats():
+    """Returns hit/miss counters and occupancy of the result cache."""
+    return get_cache().stats()
+
+@app.get("/api/admin/plans", summary="Get EXPLAIN summaries of all queries")
+async def get_query_plans(refresh: bool = False, issues_only: bool = False):
+    """
+    Returns the operators, expensive operators and server notifications of
+    every query from the last plan inspection. Pass refresh=true to plan the
+    currently loaded queries again.
+    """
+    report = query_plans.get_plan_report()
+    if refresh:
+        try:
+            report = await query_plans.inspect_queries(await db.get_driver(), get_registry().current())
+        except Exception:
+            logger.error("An error occurred while inspecting query plans.", exc_info=True)
+            raise HTTPException(status_code=500, detail="An internal server error occurred.")
+    summaries = [{**asdict(s), "ok": s.ok} for s in report.summaries if not (issues_only and s.ok)]
+    return {
+        "completed_at": report.completed_at,
+        "queries_mtime": report.queries_mtime,
+        "summaries": summaries,
+    }
+
+@app.get("/api/admin/rollup", summary="Get rollup engine status")
+async def get_rollup_stats():
+    """Returns whether the rollup engine is loaded, its fact and dimension counts and when it was loaded."""
+    return {"enabled": settings.rollup_enabled, **get_rollup_engine().stats()}
+
+@app.post("/api/admin/rollup/refresh", summary="Reload the rollup engine")
+async def refresh_rollup():
+    """Reloads the AggTx facts into the rollup engine, e.g. right after the nightly load."""
+    if not settings.rollup_enabled:
+        raise HTTPException(status_code=400, detail="The rollup engine is not enabled.")
+    try:
+        await _load_rollup(await db.get_driver())
+    except Exception:
+        logger.error("An error occurred while reloading the rollup engine.", exc_info=True)
+        raise HTTPException(status_code=500, detail="An internal server error occurred.")
+    return get_rollup_engine().stats()
+
+@app.post("/api/admin/cache/invalidate", summary="Invalidate cached query results")
+async def invalidate_cache(query_set: str | None = None):
+    """Drops all cached results (including cached properties), or only those of one query set."""
+    removed = get_cache().invalidate(query_set)
+    if query_set is None:
+        get_properties_cache().invalidate()
+    logger.info(f"Invalidated {removed} cached result(s) for {query_set or 'all query sets'}.")
+    return {"invalidated": removed, "query_set": query_set}
@@ -0,0 +1,188 @@
+import bisect
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = (1_000, 10_000, 100_000, 1_000_000, 10_000_000, 100_000_000)
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Histogram:
+    """A labelled histogram rendered in the Prometheus text format."""
+
+    def __init__(self, name: str, help_text: str, label_names: tuple[str, ...], buckets: tuple[float, ...]):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        self._series: dict[tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for label_values, (counts, total, count) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += bucket_count
+                    labels = _format_labels(self.label_names, label_values, f'le="{_format_number(bound)}"')
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                labels = _format_labels(self.label_names, label_values)
+                lines.append(f"{self.name}_sum{labels} {total}")
+                lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+class Counter:
+    """A labelled, monotonically increasing counter."""
+
+    def __init__(self, name: str, help_text: str, label_names: tuple[str, ...] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self._values: dict[tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for label_values, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.label_names, label_values)} {value}")
+        return lines
+
+class Gauge:
+    """An unlabelled gauge, either set directly or read from a callback at scrape time."""
+
+    def __init__(self, name: str, help_text: str, callback: Callable[[], float] | None = None):
+        self.name = name
+        self.help_text = help_text
+        self.callback = callback
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1) -> None:
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1) -> None:
+        with self._lock:
+            self.value -= amount
+
+    def render(self) -> list[str]:
+        value = self.callback() if self.callback else self.value
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} gauge", f"{self.name} {value}"]
+
+class MetricsRegistry:
+    """Holds every metric of the process and renders them for /metrics."""
+
+    def __init__(self):
+        self._metrics: list = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+registry = MetricsRegistry()
+
+# Phases: acquire (session open until the transaction function runs, i.e.
+# pool acquisition, routing and BEGIN), execute (RUN until the result header
+# arrives), fetch (pulling all records), build (Cytoscape conversion),
+# serialize (converting records to plain data), encode (rendering the
+# response body), compress (gzip/brotli content coding), rollup (answering
+# from the in-memory rollup engine instead of Neo4j) and layout (server-side
+# node positions).
+query_phase_seconds = registry.register(Histogram(
+    "kge_query_phase_seconds", "Time spent per query phase.",
+    ("query_set", "query_type", "phase"), LATENCY_BUCKETS))
+response_bytes = registry.register(Histogram(
+    "kge_response_bytes", "Size of serialized API responses.",
+    ("query_set", "query_type"), SIZE_BUCKETS))
+query_errors_total = registry.register(Counter(
+    "kge_query_errors_total", "Queries that raised an error.",
+    ("query_set", "query_type")))
+cache_hits_total = registry.register(Counter(
+    "kge_cache_hits_total", "Graph queries answered from the result cache.",
+    ("query_set", "query_type")))
+coalesced_executions_total = registry.register(Counter(
+    "kge_coalesced_executions_total", "Query executions (and layouts) saved by sharing an identical one in flight.",
+    ("query_set", "query_type")))
+conditional_responses_total = registry.register(Counter(
+    "kge_conditional_responses_total", "Graph responses sent as 304 Not Modified or as a delta.",
+    ("query_set", "query_type", "outcome")))
+sessions_in_use = registry.register(Gauge(
+    "kge_pool_sessions_in_use", "Neo4j sessions currently open, each holding or waiting for a pooled connection."))
+registry.register(Gauge(
+    "kge_pool_max_size", "Configured maximum size of the Neo4j connection pool.",
+    lambda: settings.neo4j_max_connection_pool_size))
+
+@contextmanager
+def timer(query_set: str, query_type: str, phase: str) -> Iterator[None]:
+    """Records the duration of the wrapped block as one phase of a query."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        query_phase_seconds.observe(time.perf_counter() - start, query_set, query_type, phase)
+
+@contextmanager
+def session_in_use() -> Iterator[None]:
+    """Tracks an open session in the pool usage gauge."""
+    sessions_in_use.inc()
+    try:
+        yield
+    finally:
+        sessions_in_use.dec()
+
+def log_if_slow(query_set: str, query_type: str, seconds: float, query: str, params: dict, record_count: int | None = None) -> None:
+    """
+    Logs the query text and parameters if the query took longer than the
+    configured threshold. Only a sample of slow queries is logged, so a
+    slow period does not flood the log.
+    """
+    if seconds * 1000 < settings.slow_query_threshold_ms:
+        return
+    if random.random() >= settings.slow_query_log_sample_rate:
+        return
+    records = f", {record_count} records" if record_count is not None else ""
+    logger.warning(
+        f"Slow {query_set}/{query_type} query: {seconds * 1000:.0f} ms{records}.\n"
+        f"{query.strip()}\nParameters: {params}"
+    )
@@ -0,0 +1,18 @@
+import asyncio
+from typing import Callable, TypeVar
+from .config import settings
+
+T = TypeVar("T")
+
+async def run(fn: Callable[..., T], *args, items: int = 0, size: int = 0) -> T:
+    """
+    Runs the CPU-bound `fn(*args)` in a worker thread if its input has at
+    least OFFLOAD_MIN_ITEMS records or elements, or OFFLOAD_MIN_BYTES bytes,
+    so building, serializing, encoding or compressing a large result does
+    not block the event loop (and every other request, /api/ready and
+    /metrics included). Smaller inputs run inline, where the thread handoff
+    would cost more than it saves.
+    """
+    if items >= settings.offload_min_items or size >= settings.offload_min_bytes:
+        return await asyncio.to_thread(fn, *args)
+    return fn(*args)
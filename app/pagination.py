@@ -0,0 +1,35 @@
+import base64
+import binascii
+import orjson
+
+def encode_cursor(scope: str, sort_value, element_id: str) -> str:
+    """
+    Encodes the position after the last row of a page as an opaque, URL-safe
+    string. `scope` (e.g. "client_360_view/primary") is embedded so a cursor
+    cannot be replayed against a different query.
+    """
+    payload = orjson.dumps([scope, sort_value, element_id])
+    return base64.urlsafe_b64encode(payload).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str, scope: str) -> tuple:
+    """Returns (sort value, element ID) of a cursor; raises ValueError if it is malformed or from another query."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        cursor_scope, sort_value, element_id = orjson.loads(base64.urlsafe_b64decode(padded))
+    except (binascii.Error, orjson.JSONDecodeError, ValueError, TypeError):
+        raise ValueError("Invalid pagination cursor.")
+    if cursor_scope != scope or not isinstance(element_id, str):
+        raise ValueError("Pagination cursor does not belong to this query.")
+    return sort_value, element_id
+
+def column_value(record, path: str):
+    """
+    Reads a paging key from a record. `path` is a column name, optionally
+    followed by dotted map keys or node properties (e.g. "overlay.totalAmount").
+    A node or relationship stands for its element ID.
+    """
+    column, *keys = path.split(".")
+    value = record[column]
+    for key in keys:
+        value = None if value is None else value.get(key)
+    return getattr(value, "element_id", value)
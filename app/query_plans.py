@@ -0,0 +1,156 @@
+import asyncio
+import logging
+import re
+import time
+from dataclasses import dataclass, field
+from neo4j import READ_ACCESS, AsyncDriver
+from .query_registry import QuerySnapshot
+from .repository import EDGE_PROPERTIES_BATCH_QUERY, NODE_PROPERTIES_BATCH_QUERY
+
+logger = logging.getLogger(__name__)
+
+# Operators that scan a whole store or multiply rows; in a query of this app
+# they usually mean a missing label, index or join condition.
+EXPENSIVE_OPERATORS = frozenset((
+    "AllNodesScan",
+    "DirectedAllRelationshipsScan",
+    "UndirectedAllRelationshipsScan",
+    "CartesianProduct",
+    "Eager",
+))
+
+_PARAM = re.compile(r"\$(\w+)")
+_SAMPLE_ID = "4:00000000-0000-0000-0000-000000000000:0"
+
+def representative_params(query: str) -> dict:
+    """Builds plausible values for every parameter a query uses, so it can be planned."""
+    params = {}
+    for name in set(_PARAM.findall(query)):
+        if name == "months":
+            params[name] = 1
+        elif name == "limit":
+            params[name] = 10
+        elif name.endswith("node_id"):
+            params[name] = _SAMPLE_ID
+        elif name == "ids":
+            params[name] = [_SAMPLE_ID]
+        elif name == "__rows":
+            row = {"__parent": _SAMPLE_ID, "node_id": _SAMPLE_ID}
+            row.update({field_name: _SAMPLE_ID for field_name in re.findall(r"__row\.(\w*node_id)\b", query)})
+            params[name] = [row]
+        else:
+            params[name] = None
+    return params
+
+@dataclass(frozen=True)
+class PlanSummary:
+    """The outcome of planning one query with EXPLAIN."""
+    query_set: str
+    query_type: str
+    label: str | None
+    operators: list[str]
+    expensive_operators: list[str]
+    notifications: list[dict]
+    error: str | None = None
+    planning_ms: float = 0.0
+
+    @property
+    def issues(self) -> list[dict]:
+        """Notifications that need attention: warnings and performance hints (e.g. a missing index)."""
+        return [n for n in self.notifications
+                if n.get("severity") == "WARNING" or n.get("classification") == "PERFORMANCE"]
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and not self.expensive_operators and not self.issues
+
+def _operators(plan: dict | None) -> list[str]:
+    """Returns the operator names of a plan tree, root first, without the runtime suffix (e.g. "@neo4j")."""
+    operators, stack = [], [plan] if plan else []
+    while stack:
+        node = stack.pop()
+        operators.append(node.get("operatorType", "").split("@")[0])
+        stack.extend(reversed(node.get("children", [])))
+    return operators
+
+def _queries_to_check(snapshot: QuerySnapshot) -> list[tuple[str, str, str | None, str]]:
+    """Every query of every enabled set, their batched forms and the repository's built-in queries."""
+    queries = [
+        ("_builtin", "properties", "node", NODE_PROPERTIES_BATCH_QUERY),
+        ("_builtin", "properties", "edge", EDGE_PROPERTIES_BATCH_QUERY),
+    ]
+    for name, details in snapshot.query_sets.items():
+        if not details.get("enabled", False):
+            continue
+        for query_type in ("primary", "table_query"):
+            if details.get(query_type):
+                queries.append((name, query_type, None, details[query_type]))
+        for label, query in details.get("neighbors", {}).items():
+            queries.append((name, "neighbors", label, query))
+            batched = snapshot.batched_neighbors.get(name, {}).get(label)
+            if batched is not None:
+                queries.append((name, "neighbors_batched", label, batched))
+    return queries
+
+async def _explain(driver: AsyncDriver, query_set: str, query_type: str, label: str | None, query: str) -> PlanSummary:
+    async def work(tx):
+        result = await tx.run(f"EXPLAIN {query}", representative_params(query))
+        return await result.consume()
+
+    start = time.perf_counter()
+    try:
+        async with driver.session(default_access_mode=READ_ACCESS) as session:
+            summary = await session.execute_read(work)
+    except Exception as e:
+        return PlanSummary(query_set, query_type, label, [], [], [], error=str(e))
+    operators = _operators(summary.plan)
+    notifications = [
+        {
+            "code": status.gql_status,
+            "description": status.status_description,
+            "severity": status.raw_severity,
+            "classification": status.raw_classification,
+        }
+        for status in summary.gql_status_objects if status.is_notification
+    ]
+    return PlanSummary(
+        query_set, query_type, label, operators,
+        sorted({op for op in operators if op in EXPENSIVE_OPERATORS}),
+        notifications,
+        planning_ms=(time.perf_counter() - start) * 1000,
+    )
+
+@dataclass
+class PlanReport:
+    """The latest plan inspection; `completed_at` is None until a run has finished."""
+    summaries: list[PlanSummary] = field(default_factory=list)
+    queries_mtime: float | None = None
+    completed_at: float | None = None
+
+_report = PlanReport()
+
+def get_plan_report() -> PlanReport:
+    """Returns the latest plan inspection report."""
+    return _report
+
+async def inspect_queries(driver: AsyncDriver, snapshot: QuerySnapshot) -> PlanReport:
+    """
+    Plans every query of the snapshot with EXPLAIN and logs queries that fail
+    to compile, use expensive operators or draw warnings or performance
+    notifications (e.g. a missing index). EXPLAIN does not run the query, but it does put its plan into the
+    server's query cache, so this also spares the first real request the
+    planning cost.
+    """
+    global _report
+    summaries = await asyncio.gather(*(_explain(driver, *entry) for entry in _queries_to_check(snapshot)))
+    for s in summaries:
+        name = f"{s.query_set}/{s.query_type}" + (f"[{s.label}]" if s.label else "")
+        if s.error:
+            logger.error(f"Query {name} failed to plan: {s.error}")
+        elif not s.ok:
+            issues = [n["description"] for n in s.issues]
+            logger.warning(f"Query {name} plan needs attention: expensive operators {s.expensive_operators}, notifications {issues}")
+    failed = sum(1 for s in summaries if not s.ok)
+    logger.info(f"Planned {len(summaries)} queries; {failed} need attention.")
+    _report = PlanReport(list(summaries), snapshot.mtime, time.time())
+    return _report
@@ -0,0 +1,175 @@
+import logging
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+import yaml
+from .config import settings
+from .graph_builder import GraphBuilder
+
+logger = logging.getLogger(__name__)
+
+_NODE_ID_PARAM = re.compile(r"\$(\w*node_id)\b")
+_WITH_CLAUSE = re.compile(r"(?<!STARTS )(?<!ENDS )\bWITH(\s+DISTINCT)?\s+", re.IGNORECASE)
+_RETURN_CLAUSE = re.compile(r"\bRETURN\s+", re.IGNORECASE)
+
+def batch_neighbor_query(query: str) -> str | None:
+    """
+    Rewrites a single-node neighbor query into one that expands many parents
+    at once. Each row of the `$__rows` list carries a parent's `node_id`, its
+    `<Label>_node_id` history and its synthetic ID as `__parent`:
+
+      * `$node_id` / `$<Label>_node_id` become fields of the unwound `__row`,
+      * every WITH carries `__row` along (so aggregations group per parent),
+      * the final RETURN is prefixed with the parent's synthetic ID.
+
+    Returns None for queries this rewrite cannot handle safely.
+    """
+    if re.search(r"\bUNION\b", query, re.IGNORECASE):
+        return None
+    returns = list(_RETURN_CLAUSE.finditer(query))
+    if not returns:
+        return None
+    last_return = returns[-1]
+    head, tail = query[:last_return.start()], query[last_return.end():]
+    head = _WITH_CLAUSE.sub(lambda m: f"WITH{m.group(1) or ''} __row, ", head)
+    rewritten = f"UNWIND $__rows AS __row\n{head}RETURN __row.__parent AS __parent, {tail}"
+    return _NODE_ID_PARAM.sub(r"__row.\1", rewritten)
+
+@dataclass(frozen=True)
+class QuerySnapshot:
+    """An immutable, fully validated view of queries.yaml at one point in time."""
+    query_sets: dict
+    available_queries: list[dict]
+    graph_builders: dict[str, GraphBuilder]
+    # query set name -> node label -> batched neighbor query (None if not batchable)
+    batched_neighbors: dict[str, dict[str, str | None]]
+    mtime: float
+    loaded_at: float = field(default_factory=time.time)
+
+class QueryRegistry:
+    """
+    Process-wide registry of Cypher query sets.
+
+    The YAML file is parsed and validated once, and re-parsed only when its
+    mtime changes. A reload swaps the whole snapshot at once, so a request
+    never sees a half-loaded file. If a reload fails validation, the previous
+    snapshot stays active.
+    """
+
+    def __init__(self, path: str, check_interval: float = 2.0):
+        self.path = path
+        self.check_interval = check_interval
+        self._snapshot: QuerySnapshot | None = None
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+
+    def current(self) -> QuerySnapshot:
+        """Returns the active snapshot, reloading it first if the file changed."""
+        snapshot = self._snapshot
+        if snapshot is None:
+            return self.load()
+        now = time.monotonic()
+        if now - self._last_check >= self.check_interval:
+            self._last_check = now
+            try:
+                mtime = os.stat(self.path).st_mtime
+            except OSError:
+                logger.warning(f"Could not stat {self.path}; keeping the loaded queries.", exc_info=True)
+                return snapshot
+            if mtime != snapshot.mtime:
+                try:
+                    return self.load()
+                except Exception:
+                    logger.error(f"Reloading {self.path} failed; keeping the previous queries.", exc_info=True)
+        return self._snapshot
+
+    def load(self) -> QuerySnapshot:
+        """Parses and validates the query file, then atomically activates it."""
+        with self._lock:
+            mtime = os.stat(self.path).st_mtime
+            if self._snapshot is not None and self._snapshot.mtime == mtime:
+                return self._snapshot
+            logger.info(f"Loading queries from {self.path}")
+            with open(self.path, 'r') as file:
+                query_sets = yaml.safe_load(file) or {}
+            self._validate(query_sets)
+            self._snapshot = QuerySnapshot(
+                query_sets=query_sets,
+                available_queries=self._build_available_queries(query_sets),
+                graph_builders={
+                    name: GraphBuilder(details.get("mapping", {}), details.get("caption_property", "name"))
+                    for name, details in query_sets.items()
+                },
+                batched_neighbors={
+                    name: {label: batch_neighbor_query(query) for label, query in details.get("neighbors", {}).items()}
+                    for name, details in query_sets.items()
+                },
+                mtime=mtime,
+            )
+            self._last_check = time.monotonic()
+            logger.info(f"Loaded {len(query_sets)} query set(s).")
+            return self._snapshot
+
+    def _validate(self, query_sets: dict) -> None:
+        """Raises ValueError if the parsed file does not have the expected shape."""
+        if not isinstance(query_sets, dict):
+            raise ValueError(f"{self.path} must contain a mapping of query sets.")
+        for name, details in query_sets.items():
+            if not isinstance(details, dict):
+                raise ValueError(f"Query set '{name}' must be a mapping.")
+            for key in ("primary", "table_query"):
+                if key in details and not isinstance(details[key], str):
+                    raise ValueError(f"Query set '{name}': '{key}' must be a Cypher string.")
+            neighbors = details.get("neighbors", {})
+            if not isinstance(neighbors, dict):
+                raise ValueError(f"Query set '{name}': 'neighbors' must map node labels to Cypher strings.")
+            for label, query in neighbors.items():
+                if not isinstance(query, str):
+                    raise ValueError(f"Query set '{name}': neighbor query for '{label}' must be a Cypher string.")
+            for key in ("mapping", "colors", "table_display"):
+                if key in details and not isinstance(details[key], dict):
+                    raise ValueError(f"Query set '{name}': '{key}' must be a mapping.")
+            ttl = details.get("cache_ttl")
+            if ttl is not None and (isinstance(ttl, bool) or not isinstance(ttl, (int, float)) or ttl < 0):
+                raise ValueError(f"Query set '{name}': 'cache_ttl' must be a non-negative number of seconds.")
+            paging = details.get("pagination", {})
+            if not isinstance(paging, dict):
+                raise ValueError(f"Query set '{name}': 'pagination' must be a mapping.")
+            for key, config in paging.items():
+                if key not in ("primary", "table_query"):
+                    raise ValueError(f"Query set '{name}': only 'primary' and 'table_query' can be paginated.")
+                if not isinstance(config, dict) or not all(isinstance(config.get(k), str) for k in ("sort_key", "id_key")):
+                    raise ValueError(f"Query set '{name}': pagination of '{key}' needs 'sort_key' and 'id_key' column names.")
+                if "$cursor_id" not in details.get(key, ""):
+                    raise ValueError(f"Query set '{name}': '{key}' is paginated but does not filter on $cursor_sort/$cursor_id.")
+            if not isinstance(details.get("rollup", False), bool):
+                raise ValueError(f"Query set '{name}': 'rollup' must be true or false.")
+            if details.get("enabled", False) and not details.get("primary"):
+                raise ValueError(f"Query set '{name}' is enabled but has no 'primary' query.")
+
+    def _build_available_queries(self, query_sets: dict) -> list[dict]:
+        """Precomputes the payload served by /api/queries."""
+        available_queries = []
+        for name, details in query_sets.items():
+            if details.get("enabled", False):
+                available_queries.append({
+                    "name": name,
+                    "display_name": details.get("display_name", name.replace('_', ' ').title()),
+                    "description": details.get("description", ""),
+                    "caption_property": details.get("caption_property", "name"),
+                    "mapping": details.get("mapping", {}),
+                    "colors": details.get("colors", {}), # Pass the color map
+                    "table_query": details.get("table_query")
+                })
+        return available_queries
+
+_registry: QueryRegistry | None = None
+
+def get_registry() -> QueryRegistry:
+    """Returns the singleton query registry, creating it if necessary."""
+    global _registry
+    if _registry is None:
+        _registry = QueryRegistry(settings.queries_file_path, settings.queries_reload_interval)
+    return _registry
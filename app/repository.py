@@ -1,123 +1,295 @@
+import asyncio
 import logging
-import yaml
-from neo4j import Driver, Record
-from neo4j.spatial import Point
-from neo4j.time import Date, Time, DateTime, Duration
+import time
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable
+from neo4j import READ_ACCESS, AsyncDriver, AsyncResult
+from . import layout, metrics, offload, pagination, serializers
+from .cache import CacheBackend, get_cache, get_properties_cache, make_key
 from .config import settings
+from .query_registry import QueryRegistry, get_registry
+from .rollup import RollupEngine, get_rollup_engine
+from .singleflight import get_single_flight
 
 logger = logging.getLogger(__name__)
 
+NODE_PROPERTIES_BATCH_QUERY = "UNWIND $ids AS id MATCH (n) WHERE elementId(n) = id RETURN id, properties(n) AS props"
+# A directed pattern matches each relationship once, instead of once from each end.
+EDGE_PROPERTIES_BATCH_QUERY = "UNWIND $ids AS id MATCH ()-[r]->() WHERE elementId(r) = id RETURN id, properties(r) AS props"
+
 class GraphRepository:
-    def __init__(self, driver: Driver):
+    def __init__(self, driver: AsyncDriver, registry: QueryRegistry | None = None, cache: CacheBackend | None = None):
         self.driver = driver
-        self.query_sets = self._load_queries()
-
-    def _load_queries(self) -> dict:
-        """Loads Cypher query sets from the specified YAML file."""
-        logger.info(f"Loading queries from {settings.queries_file_path}")
-        with open(settings.queries_file_path, 'r') as file:
-            return yaml.safe_load(file)
+        # Pin one snapshot for the lifetime of this repository (one request),
+        # so a concurrent reload cannot change queries mid-request.
+        self.queries = (registry or get_registry()).current()
+        self.query_sets = self.queries.query_sets
+        self.cache = cache or (get_cache() if settings.cache_enabled else None)
+        self.properties_cache = get_properties_cache() if settings.cache_enabled else None
+        self.rollup = get_rollup_engine() if settings.rollup_enabled else None
+        # Concurrent identical graph and table queries share one execution.
+        self.inflight = get_single_flight() if settings.coalesce_queries else None
 
     def get_available_queries(self) -> list[dict]:
         """
         Returns a list of all enabled queries with their metadata.
         """
-        available_queries = []
-        for name, details in self.query_sets.items():
-            if details.get("enabled", False):
-                available_queries.append({
-                    "name": name,
-                    "display_name": details.get("display_name", name.replace('_', ' ').title()),
-                    "description": details.get("description", ""),
-                    "caption_property": details.get("caption_property", "name"),
-                    "mapping": details.get("mapping", {}),
-                    "colors": details.get("colors", {}), # Pass the color map
-                    "table_query": details.get("table_query")
-                })
-        return available_queries
-
-    def get_node_properties(self, node_id: str) -> dict | None:
+        return self.queries.available_queries
+
+    async def get_node_properties(self, node_id: str) -> dict | None:
         """
         Fetches all properties for a single node given its element ID.
-        It can handle synthetic IDs (e.g., "relId_nodeId") by parsing them.
+        It can handle synthetic IDs (e.g., "parentId_nodeId") by parsing them.
         """
-        # Handle synthetic IDs by splitting on '_' and taking the last part
-        real_node_id = node_id.split('_')[-1]
-        
-        query = "MATCH (n) WHERE elementId(n) = $node_id RETURN n"
-        params = {"node_id": real_node_id}
         try:
-            with self.driver.session() as session:
-                result = session.run(query, params)
-                record = result.single()
-            if record and len(record) > 0:
-                node = record[0]
-                if hasattr(node, 'labels'):
-                    # Return properties, AND the real ID
-                    props = dict(node.items())
-                    props["original_element_id"] = real_node_id
-                    return props
-            return None
+            return (await self.get_properties_batch([node_id], []))["nodes"].get(node_id)
         except Exception:
-            logger.error(f"An exception occurred fetching properties for node {node_id} (real: {real_node_id})", exc_info=True)
+            logger.error(f"An exception occurred fetching properties for node {node_id}", exc_info=True)
             return None
 
-    def get_edge_properties(self, edge_id: str) -> dict | None:
+    async def get_edge_properties(self, edge_id: str) -> dict | None:
         """
         Fetches all properties for a single relationship given its element ID.
         """
-        query = "MATCH ()-[r]-() WHERE elementId(r) = $edge_id RETURN properties(r) LIMIT 1"
-        params = {"edge_id": edge_id}
         try:
-            with self.driver.session() as session:
-                result = session.run(query, params)
-                record = result.peek()
-            if record and len(record) > 0:
-                props = record[0]
-                if isinstance(props, dict):
-                    return props
-            return None
+            return (await self.get_properties_batch([], [edge_id]))["edges"].get(edge_id)
         except Exception:
             logger.error(f"An exception occurred fetching properties for edge {edge_id}", exc_info=True)
             return None
 
-    def execute_table_query(self, query: str, params: dict) -> dict:
+    async def get_properties_batch(self, node_ids: list[str], edge_ids: list[str]) -> dict:
+        """
+        Fetches the properties of many nodes and relationships with one UNWIND
+        query per kind. Node IDs may be synthetic ("parentId_nodeId"). Results are
+        keyed by the ID as requested; IDs that do not resolve map to None.
+        Resolved properties are kept in a small LRU cache keyed by element ID.
+        """
+        real_node_ids = {node_id: node_id.split('_')[-1] for node_id in node_ids}
+        node_props = await self._fetch_properties("node", set(real_node_ids.values()), NODE_PROPERTIES_BATCH_QUERY)
+        edge_props = await self._fetch_properties("edge", set(edge_ids), EDGE_PROPERTIES_BATCH_QUERY)
+        return {
+            "nodes": {node_id: node_props.get(real_id) for node_id, real_id in real_node_ids.items()},
+            "edges": {edge_id: edge_props.get(edge_id) for edge_id in edge_ids},
+        }
+
+    async def _fetch_properties(self, kind: str, element_ids: set[str], query: str) -> dict[str, dict]:
+        found, missing = {}, []
+        for element_id in element_ids:
+            cached = self.properties_cache.get((kind, element_id)) if self.properties_cache is not None else None
+            if cached is not None:
+                found[element_id] = cached
+            else:
+                missing.append(element_id)
+        if not missing:
+            return found
+
+        records, _ = await self._read(query, {"ids": missing}, "_properties", kind)
+        for record in records:
+            element_id, props = record["id"], serializers.serialize_value(record["props"])
+            if kind == "node":
+                # Return properties, AND the real ID
+                props["original_element_id"] = element_id
+            found[element_id] = props
+            if self.properties_cache is not None:
+                self.properties_cache.set((kind, element_id), props, settings.properties_cache_ttl)
+        return found
+
+    async def execute_table_query(self, query: str, params: dict, query_set_name: str = "unknown") -> dict:
         """
         Executes a pre-defined Cypher query (for table data) and
-        returns raw record data.
+        returns raw record data. If the query set declares pagination for
+        its table query, `params["cursor"]` selects the page.
         """
         if not query:
             logger.warning("No table query provided, returning empty table.")
-            return {"records": [], "keys": []}
-            
-        logger.info(f"Final Table Query:\n{query.strip()}")
-        logger.info(f"Parameters: {params}")
-        
-        with self.driver.session() as session:
-            result = session.run(query, params)
-            records = list(result)
-            keys = result.keys()
-            
-        logger.info(f"Table query returned {len(records)} records.")
-        
+            return {"records": [], "keys": [], "next_cursor": None, "has_more": False}
+        key = make_key(query_set_name, "table", None, params, self.queries.mtime)
+        return await self._coalesced(key, query_set_name, "table", lambda: self._execute_table_query(query, params, query_set_name))
+
+    async def _execute_table_query(self, query: str, params: dict, query_set_name: str) -> dict:
+        paging = self._apply_cursor(query_set_name, "table_query", params, fetch_extra=True)
+        engine = self._rollup_for(query_set_name)
+        if engine is not None:
+            with metrics.timer(query_set_name, "table", "rollup"):
+                records, keys = await asyncio.to_thread(engine.table, params)
+        else:
+            records, keys = await self._read(query, params, query_set_name, "table")
+        logger.debug(f"Table query returned {len(records)} records.")
+        records, next_cursor, has_more = self._page(records, paging, query_set_name, "table_query", params)
+
+        with metrics.timer(query_set_name, "table", "serialize"):
+            table_records = await offload.run(serializers.serialize_records, records, items=len(records))
+        hidden = self.hidden_table_key(query_set_name)
+        if hidden is not None:
+            keys = [key for key in keys if key != hidden]
+            for record in table_records:
+                record.pop(hidden, None)
         return {
-            "records": self._records_to_json_serializable(records),
-            "keys": keys
+            "records": table_records,
+            "keys": keys,
+            "next_cursor": next_cursor,
+            "has_more": has_more
         }
 
-    def execute_query(self, query_set_name: str, query_type: str, params: dict) -> dict:
+    def hidden_table_key(self, query_set_name: str) -> str | None:
+        """Returns the table's paging ID column if it only exists for paging (its name starts with "_")."""
+        id_key = self.query_sets.get(query_set_name, {}).get("pagination", {}).get("table_query", {}).get("id_key")
+        return id_key if id_key and id_key.startswith("_") else None
+
+    def _rollup_for(self, query_set_name: str) -> RollupEngine | None:
+        """Returns the rollup engine if the query set is marked rollup-capable and the engine has loaded."""
+        if self.rollup is not None and self.rollup.ready and self.query_sets.get(query_set_name, {}).get("rollup", False):
+            return self.rollup
+        return None
+
+    def _apply_cursor(self, query_set_name: str, query_key: str, params: dict, fetch_extra: bool) -> dict | None:
+        """
+        Moves `params["cursor"]` into the `$cursor_sort`/`$cursor_id`
+        parameters of a paginated query and returns the query's pagination
+        settings, or None if the query is not paginated. With `fetch_extra`,
+        one row more than the limit is requested to tell whether another
+        page follows.
+        """
+        cursor = params.pop("cursor", None)
+        paging = self.query_sets.get(query_set_name, {}).get("pagination", {}).get(query_key)
+        if paging is None:
+            if cursor:
+                raise ValueError(f"Query set '{query_set_name}' does not support pagination of its {query_key}.")
+            return None
+        sort_value, element_id = pagination.decode_cursor(cursor, f"{query_set_name}/{query_key}") if cursor else (None, None)
+        params["cursor_sort"] = sort_value
+        params["cursor_id"] = element_id
+        if fetch_extra:
+            params["limit"] = int(params.get("limit", 10)) + 1
+        return paging
+
+    def _page(self, records: list, paging: dict | None, query_set_name: str, query_key: str, params: dict) -> tuple[list, str | None, bool]:
+        """Trims the extra row fetched by _apply_cursor and returns (records, next cursor, has more)."""
+        if paging is None:
+            return records, None, False
+        limit = int(params["limit"]) - 1
+        if len(records) <= limit:
+            return records, None, False
+        records = records[:limit]
+        last = records[-1]
+        next_cursor = pagination.encode_cursor(
+            f"{query_set_name}/{query_key}",
+            pagination.column_value(last, paging["sort_key"]),
+            pagination.column_value(last, paging["id_key"]),
+        )
+        return records, next_cursor, True
+
+    async def _read(self, query: str, params: dict, query_set_name: str, query_type: str) -> tuple[list, list[str]]:
+        """
+        Runs a query in a managed read transaction and returns its records and
+        keys. Read transactions are routed to read replicas in a cluster and
+        are retried by the driver on transient failures.
+
+        The acquire, execute and fetch phases are recorded in the metrics
+        under the given query set and type, and slow queries are logged.
+        """
+        timings = {}
+        start = time.perf_counter()
+
+        async def work(tx):
+            # The transaction function runs once a pooled connection has been
+            # acquired and the transaction begun; on a retry, acquisition time
+            # includes the failed attempts.
+            run_at = time.perf_counter()
+            result = await tx.run(query, params)
+            header_at = time.perf_counter()
+            records = [record async for record in result]
+            timings.update(acquire=run_at - start, execute=header_at - run_at, fetch=time.perf_counter() - header_at)
+            return records, result.keys()
+
+        try:
+            with metrics.session_in_use():
+                async with self.driver.session(default_access_mode=READ_ACCESS) as session:
+                    records, keys = await session.execute_read(work)
+        except Exception:
+            metrics.query_errors_total.inc(query_set_name, query_type)
+            raise
+        for phase, seconds in timings.items():
+            metrics.query_phase_seconds.observe(seconds, query_set_name, query_type, phase)
+        metrics.log_if_slow(query_set_name, query_type, time.perf_counter() - start, query, params, len(records))
+        return records, keys
+
+    def get_table_query(self, query_set_name: str) -> str:
+        """Returns the table query of an enabled query set."""
+        query_set = self.query_sets.get(query_set_name, {})
+        if not query_set.get("enabled", False):
+            raise PermissionError(f"Query set '{query_set_name}' is disabled or does not exist.")
+        query = query_set.get("table_query")
+        if not query:
+            raise ValueError(f"Query set '{query_set_name}' has no table query.")
+        return query
+
+    @asynccontextmanager
+    async def stream_table_query(self, query: str, params: dict, query_set_name: str = "unknown") -> AsyncIterator[AsyncResult]:
+        """
+        Executes a table query and yields the live result, so callers can
+        iterate records lazily while the session stays open. Records are
+        pulled from the server in batches of the driver's fetch size as the
+        caller consumes them, so memory use does not grow with the row count.
+
+        A lazily consumed result cannot be returned from a managed
+        transaction function, so this uses an auto-commit transaction in a
+        read-mode session, which is still routed to a reader. Only the time
+        to the first response (acquisition and execution) is recorded, as
+        "execute"; fetching is paced by the client.
+
+        For a paginated table query, `params["cursor"]` sets the starting
+        position; the stream itself runs up to the limit without a next cursor.
+        """
+        self._apply_cursor(query_set_name, "table_query", params, fetch_extra=False)
+        with metrics.session_in_use():
+            async with self.driver.session(default_access_mode=READ_ACCESS) as session:
+                start = time.perf_counter()
+                try:
+                    result = await session.run(query, params)
+                except Exception:
+                    metrics.query_errors_total.inc(query_set_name, "table")
+                    raise
+                seconds = time.perf_counter() - start
+                metrics.query_phase_seconds.observe(seconds, query_set_name, "table", "execute")
+                metrics.log_if_slow(query_set_name, "table", seconds, query, params)
+                yield result
+
+    async def execute_query(self, query_set_name: str, query_type: str, params: dict) -> dict:
         """
         Selects and executes a pre-defined Cypher query (for graph data)
-        and returns both graph-formatted and raw record data.
+        and returns both graph-formatted and raw record data. If the query
+        set declares pagination for its primary query, `params["cursor"]`
+        selects the page.
         """
         query_set = self.query_sets.get(query_set_name, {})
         if not query_set.get("enabled", False):
             raise PermissionError(f"Query set '{query_set_name}' is disabled or does not exist.")
         
-        mapping = query_set.get("mapping", {})
-        caption_property = query_set.get("caption_property", "name")
-        
-        # This will store the full synthetic ID (e.g., "edgeId_nodeId") passed from the frontend
+        # The key is built from the params as received (including the synthetic
+        # node ID, which shapes the output) and the snapshot's mtime, so a
+        # reload of queries.yaml never serves results of an older query.
+        cache_key = make_key(query_set_name, query_type, params.get("node_type"), params, self.queries.mtime)
+        if self.cache is not None:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                metrics.cache_hits_total.inc(query_set_name, query_type)
+                return cached
+        return await self._coalesced(cache_key, query_set_name, query_type,
+                                     lambda: self._execute_query(query_set, query_set_name, query_type, params, cache_key))
+
+    async def _coalesced(self, key: tuple, query_set_name: str, query_type: str, execute: Callable[[], Awaitable[dict]]) -> dict:
+        """Runs `execute`, or waits for an identical execution already in flight (see app/singleflight.py)."""
+        if self.inflight is None:
+            return await execute()
+        payload, shared = await self.inflight.do(key, execute)
+        if shared:
+            metrics.coalesced_executions_total.inc(query_set_name, query_type)
+        return payload
+
+    async def _execute_query(self, query_set: dict, query_set_name: str, query_type: str, params: dict, cache_key: tuple) -> dict:
+        # This will store the full synthetic ID (e.g., "parentId_nodeId") passed from the frontend
         clicked_synthetic_id = None 
 
         if query_type == "neighbors":
@@ -132,146 +304,165 @@ class GraphRepository:
                 
             node_type = params.get("node_type")
             neighbor_queries = query_set.get("neighbors", {})
-            query = neighbor_queries.get(node_type, neighbor_queries.get("_default"))
+            query_label = node_type if node_type in neighbor_queries else "_default"
+            query = neighbor_queries.get(query_label)
             if not query:
                 raise ValueError(f"No suitable neighbor query found for node type '{node_type}'.")
         else: # For 'primary' queries
+            query_label = None
             query = query_set.get(query_type)
             if not query:
                  raise ValueError(f"Query type '{query_type}' not found in query set '{query_set_name}'.")
         
         params.setdefault("limit", 10)
         params.setdefault("text_search", None)
+        paging = self._apply_cursor(query_set_name, query_type, params, fetch_extra=True) if query_type == "primary" else None
 
-        logger.info(f"Final Graph Query:\n{query.strip()}")
-        logger.info(f"Parameters: {params}")
-        
-        with self.driver.session() as session:
-            result = session.run(query, params)
-            records = list(result)
-            keys = result.keys()
-            
-        logger.info(f"Graph query returned {len(records)} records.")
-        
+        depth = int(params.get("depth", 1))
+        if query_type == "neighbors" and depth != 1:
+            if not 1 <= depth <= settings.neighbors_max_depth:
+                raise ValueError(f"depth must be between 1 and {settings.neighbors_max_depth}.")
+            payload = await self._expand_neighbors(query_set_name, params, clicked_synthetic_id, depth)
+        else:
+            records, keys = await self._graph_records(query_set_name, query_type, query_label, query, params)
+            records, next_cursor, has_more = self._page(records, paging, query_set_name, query_type, params)
+            builder = self.queries.graph_builders[query_set_name]
+            with metrics.timer(query_set_name, query_type, "build"):
+                graph = await offload.run(builder.build, records, query_type, clicked_synthetic_id, items=len(records))
+            with metrics.timer(query_set_name, query_type, "serialize"):
+                serialized = await offload.run(serializers.serialize_records, records, items=len(records))
+            payload = {
+                "graph": graph,
+                "records": serialized,
+                "keys": keys,
+                "next_cursor": next_cursor,
+                "has_more": has_more
+            }
+        if settings.layout_enabled:
+            with metrics.timer(query_set_name, query_type, "layout"):
+                payload["graph"] = await asyncio.to_thread(layout.apply, payload["graph"], clicked_synthetic_id, query_set_name)
+        if self.cache is not None:
+            self.cache.set(cache_key, payload, query_set.get("cache_ttl", settings.cache_default_ttl))
+        return payload
+
+    async def _graph_records(self, query_set_name: str, query_type: str, label: str | None, query: str, params: dict) -> tuple[list, list[str]]:
+        """Answers a primary or single-level neighbor query from the rollup engine if it can, otherwise runs the Cypher query."""
+        engine = self._rollup_for(query_set_name)
+        if engine is None:
+            return await self._run_graph_query(query, params, query_set_name, query_type)
+        with metrics.timer(query_set_name, query_type, "rollup"):
+            if query_type == "primary":
+                return await asyncio.to_thread(engine.primary, params)
+            return await asyncio.to_thread(engine.neighbors, label, [params], params)
+
+    async def _run_graph_query(self, query: str, params: dict, query_set_name: str, query_type: str) -> tuple[list, list[str]]:
+        records, keys = await self._read(query, params, query_set_name, query_type)
+        logger.debug(f"Graph query returned {len(records)} records.")
+        return records, keys
+
+    async def _expand_neighbors(self, query_set_name: str, params: dict, clicked_synthetic_id: str, depth: int) -> dict:
+        """
+        Walks the per-label neighbor chain `depth` levels down from the clicked
+        node in a single request. All parents of one level that share a label
+        are expanded by one batched (UNWIND) query, and the label groups of a
+        level run concurrently. The result uses the same synthetic-ID tree
+        scheme as single-level expansion; nodes expanded here are flagged with
+        `_expanded` so the frontend can collapse them.
+        """
+        builder = self.queries.graph_builders[query_set_name]
+        neighbor_queries = self.query_sets[query_set_name].get("neighbors", {})
+        batched_queries = self.queries.batched_neighbors.get(query_set_name, {})
+        base_params = {k: v for k, v in params.items() if not k.endswith("node_id")}
+        history = {k: v for k, v in params.items() if k.endswith("_node_id")}
+
+        # Each frontier entry is a row for the batched query plus the parent's label.
+        frontier = [({"__parent": clicked_synthetic_id, "node_id": params["node_id"], **history}, params.get("node_type"))]
+        rows_by_id = {clicked_synthetic_id: frontier[0]}
+        nodes, edges, all_records, keys = {}, {}, [], []
+
+        for level in range(depth):
+            groups = defaultdict(list)
+            for row, label in frontier:
+                query_label = label if label in neighbor_queries else "_default"
+                if query_label in neighbor_queries:
+                    groups[query_label].append(row)
+            if not groups:
+                if level == 0:
+                    raise ValueError(f"No suitable neighbor query found for node type '{params.get('node_type')}'.")
+                break
+
+            results = await asyncio.gather(*(
+                self._expand_level(query_set_name, label, neighbor_queries[label], batched_queries.get(label), rows, base_params, builder)
+                for label, rows in groups.items()
+            ))
+
+            next_frontier = []
+            for elements, records, level_keys in results:
+                all_records.extend(records)
+                keys = keys or level_keys
+                for element in elements:
+                    data = element["data"]
+                    if "source" in data:
+                        edges.setdefault(data["id"], element)
+                    else:
+                        nodes.setdefault(data["id"], element)
+                for element in elements:
+                    data = element["data"]
+                    if "source" not in data:
+                        continue
+                    parent_row, parent_label = rows_by_id[data["source"]]
+                    if data["source"] in nodes:
+                        nodes[data["source"]]["data"]["_expanded"] = True
+                    child = nodes[data["target"]]["data"]
+                    child_row = {k: v for k, v in parent_row.items() if k.endswith("_node_id")}
+                    child_row[f"{parent_label}_node_id"] = parent_row["node_id"]
+                    child_row.update({"__parent": child["id"], "node_id": child["original_element_id"]})
+                    rows_by_id[child["id"]] = (child_row, child["label"])
+                    next_frontier.append((child_row, child["label"]))
+
+            if len(next_frontier) > settings.neighbors_max_frontier:
+                logger.warning(f"Stopping expansion of {clicked_synthetic_id} at level {level + 1}: "
+                               f"{len(next_frontier)} nodes exceed the frontier limit of {settings.neighbors_max_frontier}.")
+                break
+            frontier = next_frontier
+
+        with metrics.timer(query_set_name, "neighbors", "serialize"):
+            serialized = await offload.run(serializers.serialize_records, all_records, items=len(all_records))
         return {
-            "graph": self._nodes_to_cytoscape_format(records, mapping, caption_property, query_type, clicked_synthetic_id),
-            "records": self._records_to_json_serializable(records), 
+            "graph": list(nodes.values()) + list(edges.values()),
+            "records": serialized,
             "keys": keys
         }
 
-    def _records_to_json_serializable(self, records: list[Record]) -> list[dict]:
+    async def _expand_level(self, query_set_name: str, label: str, query: str, batched_query: str | None, rows: list[dict], base_params: dict, builder) -> tuple[list[dict], list, list[str]]:
         """
-        Converts a list of Neo4j Records into a JSON-serializable format,
-        handling complex types like Nodes and Relationships.
+        Expands every parent in `rows` (all of neighbor query `label`) with the
+        rollup engine or one batched query, or one query per parent if it
+        cannot be batched.
         """
-        def serialize_value(value):
-            if isinstance(value, (Date, Time, DateTime, Duration)):
-                return str(value)
-            if isinstance(value, Point):
-                return {"srid": value.srid, "x": value.x, "y": value.y, "z": value.z}
-            if hasattr(value, 'labels'):  # It's a Node
-                return {
-                    "_type": "node",
-                    "_labels": list(value.labels),
-                    "properties": dict(value.items())
-                }
-            if hasattr(value, 'start_node'):  # It's a Relationship
-                return {
-                    "_type": "relationship",
-                    "_relation_type": type(value).__name__,
-                    "properties": dict(value.items())
-                }
-            if isinstance(value, dict):
-                return {k: serialize_value(v) for k, v in value.items()}
-            return value
-
-        return [
-            {key: serialize_value(record[key]) for key in record.keys()}
-            for record in records
-        ]
-
-    def _nodes_to_cytoscape_format(self, records: list[Record], mapping: dict, caption_property: str, query_type: str, clicked_synthetic_id: str | None = None) -> list[dict]:
-        nodes, edges, parent_nodes = {}, {}, set()
-        
-        node_size_prop = mapping.get("node_size")
-        node_community_prop = mapping.get("node_community")
-        edge_weight_prop = mapping.get("edge_weight")
+        engine = self._rollup_for(query_set_name)
+        if engine is not None or batched_query is not None:
+            if engine is not None:
+                with metrics.timer(query_set_name, "neighbors", "rollup"):
+                    records, keys = await asyncio.to_thread(engine.neighbors, label, rows, base_params)
+            else:
+                records, keys = await self._run_graph_query(batched_query, {**base_params, "__rows": rows}, query_set_name, "neighbors")
+            with metrics.timer(query_set_name, "neighbors", "build"):
+                elements = await offload.run(builder.build, records, "neighbors", None, "__parent", items=len(records))
+            return elements, records, keys
 
-        is_neighbor_query = (query_type == "neighbors")
+        results = await asyncio.gather(*(
+            self._run_graph_query(query, {**base_params, **{k: v for k, v in row.items() if k != "__parent"}}, query_set_name, "neighbors")
+            for row in rows
+        ))
+        def build() -> list[dict]:
+            elements = []
+            for row, (records, _) in zip(rows, results):
+                elements.extend(builder.build(records, "neighbors", row["__parent"]))
+            return elements
 
-        for record in records:
-            record_rel = None
-            record_nodes = []
-
-            # Find all relationships and nodes in the current record
-            for _, value in record.items():
-                if value is None: continue
-                if hasattr(value, 'start_node'):
-                    record_rel = value
-                elif hasattr(value, 'labels'):
-                    record_nodes.append(value)
-            
-            # --- Primary Query (e.g., initial search) ---
-            if not is_neighbor_query:
-                for node in record_nodes:
-                    node_id = node.element_id
-                    if node_id not in nodes:
-                        node_label = list(node.labels)[0] if node.labels else "Node"
-                        caption = node.get(caption_property, node.get("name", node_label))
-                        node_data = {
-                            "id": node_id,
-                            "label": node_label,
-                            "name": caption,
-                            "original_element_id": node.element_id # Store for consistency
-                        }
-                        if node_size_prop and node.get(node_size_prop) is not None:
-                            node_data["size"] = node.get(node_size_prop)
-                        if node_community_prop and node.get(node_community_prop) is not None:
-                            community_id = str(node.get(node_community_prop))
-                            node_data["parent"] = community_id
-                            parent_nodes.add(community_id)
-                        nodes[node_id] = {"data": node_data}
-            
-            # --- Neighbor Query (drill-down) ---
-            elif record_rel:
-                edge_id = record_rel.element_id
-                
-                # The parent_id *must* be the ID of the node that was clicked in Cytoscape
-                parent_id = clicked_synthetic_id
-
-                # Find the child node (the one that is NOT the parent)
-                child_node = next((n for n in record_nodes if n.element_id == record_rel.end_node.element_id), None)
-                
-                if child_node:
-                    # Create a NEW, UNIQUE ID for the child node to force a "tree" structure
-                    # This prevents collisions if the same child node is reached via different paths
-                    unique_child_id = f"{edge_id}_{child_node.element_id}"
-                    
-                    if unique_child_id not in nodes:
-                        node_label = list(child_node.labels)[0] if child_node.labels else "Node"
-                        caption = child_node.get(caption_property, child_node.get("name", node_label))
-                        node_data = {
-                            "id": unique_child_id, # <-- The synthetic ID
-                            "label": node_label,
-                            "name": caption,
-                            "original_element_id": child_node.element_id # Store real ID
-                        }
-                        if node_size_prop and child_node.get(node_size_prop) is not None:
-                            node_data["size"] = child_node.get(node_size_prop)
-                        
-                        nodes[unique_child_id] = {"data": node_data}
-
-                    # Add the NEW EDGE
-                    if edge_id not in edges:
-                        edge_data = { 
-                            "id": edge_id, 
-                            "source": parent_id, # <-- Parent's synthetic ID
-                            "target": unique_child_id, # <-- Child's synthetic ID
-                            "label": type(record_rel).__name__ 
-                        }
-                        if edge_weight_prop and record_rel.get(edge_weight_prop) is not None:
-                            edge_data["weight"] = record_rel.get(edge_weight_prop)
-                        edges[edge_id] = {"data": edge_data}
-
-        compound_nodes = [{"data": {"id": pid}} for pid in parent_nodes]
-        return list(nodes.values()) + list(edges.values()) + compound_nodes
\ No newline at end of file
+        all_records = [record for records, _ in results for record in records]
+        keys = next((row_keys for _, row_keys in results if row_keys), [])
+        with metrics.timer(query_set_name, "neighbors", "build"):
+            elements = await offload.run(build, items=len(all_records))
+        return elements, all_records, keys
@@ -0,0 +1,355 @@
+import asyncio
+import datetime
+import itertools
+import logging
+import threading
+import time
+from zoneinfo import ZoneInfo
+from neo4j import READ_ACCESS, AsyncDriver, Record
+from neo4j.graph import Node, Relationship
+from . import serializers
+from .config import settings
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is only needed when the rollup engine is enabled.
+    np = None
+
+logger = logging.getLogger(__name__)
+
+# The AggTx star schema in drill-down order: dimension label, relationship
+# from the fact node, property shown in captions and the table, column name
+# in the neighbor queries, and column name in the table query.
+DIMENSIONS = (
+    ("Client", "FOR_CLIENT", "name", "c", "Client"),
+    ("DepositProduct", "FOR_DEPOSIT_PRODUCT", "name", "dp", "DepProduct"),
+    ("Flow", "FOR_FLOW", "direction", "f", "Flow"),
+    ("PaymentProduct", "FOR_PAYMENT_PRODUCT", "name", "pp", "PayProduct"),
+    ("FinancialInstitution", "FOR_FI", "name", "fi", "FI"),
+    ("Prospect", "FOR_PROSPECT", "name", "p", "Prospect"),
+)
+LABELS = tuple(d[0] for d in DIMENSIONS)
+TABLE_KEYS = [d[4] for d in DIMENSIONS] + ["Month", "totalAmount", "txCount", "_row_id"]
+
+# One row per fact with the element ID of each of its dimensions (null if missing).
+FACTS_QUERY = (
+    "MATCH (agg:AggTx) RETURN elementId(agg) AS id, agg.monthId AS monthId, "
+    "agg.totalAmount AS totalAmount, agg.txCount AS txCount, "
+    + ", ".join(f"head([(agg)-[:{rel}]->(d) | elementId(d)]) AS {label}" for label, rel, *_ in DIMENSIONS)
+)
+DIMENSIONS_QUERY = (
+    "MATCH (n) WHERE " + " OR ".join(f"n:{label}" for label in LABELS)
+    + " RETURN elementId(n) AS id, labels(n) AS labels, properties(n) AS props"
+)
+
+class RollupNode:
+    """A dimension node held by the engine; it quacks like neo4j.graph.Node for the graph builder and serializers."""
+    __slots__ = ("element_id", "labels", "_properties")
+
+    def __init__(self, element_id: str, labels, properties: dict):
+        self.element_id = element_id
+        self.labels = frozenset(labels)
+        self._properties = properties
+
+    def get(self, name: str, default=None):
+        return self._properties.get(name, default)
+
+    def items(self):
+        return self._properties.items()
+
+    def __getitem__(self, name: str):
+        return self._properties[name]
+
+class RollupRelationship:
+    """An aggregate relationship from a parent to a child, like the virtual AGG_TO relationships of the Cypher queries."""
+    __slots__ = ("element_id", "start_node", "end_node", "_properties")
+    type = "AGG_TO"
+
+    def __init__(self, element_id: str, start_node: RollupNode, end_node: RollupNode, properties: dict):
+        self.element_id = element_id
+        self.start_node = start_node
+        self.end_node = end_node
+        self._properties = properties
+
+    def get(self, name: str, default=None):
+        return self._properties.get(name, default)
+
+    def items(self):
+        return self._properties.items()
+
+serializers.register(RollupNode, Node)
+serializers.register(RollupRelationship, Relationship)
+
+# Text searches whose client masks are kept per load.
+CLIENT_MASK_CACHE_SIZE = 256
+
+# Virtual relationships get a fresh ID per result, as apoc.create.vRelationship does.
+_relationship_ids = itertools.count(1)
+
+def month_window(months: int, today: datetime.date | None = None) -> list[str]:
+    """
+    The `validMonths` of the Cypher queries: this month and the months before
+    it, as "YYYY-MM". Cypher's date() is today in the database's default time
+    zone, which ROLLUP_TIMEZONE has to match.
+    """
+    today = today or datetime.datetime.now(ZoneInfo(settings.rollup_timezone)).date()
+    current = today.year * 12 + today.month - 1
+    return [f"{(current - i) // 12:04d}-{(current - i) % 12 + 1:02d}" for i in range(months)]
+
+def format_amount(value) -> str:
+    """Formats a number like apoc.number.format() with its default pattern, "#,##0.###"."""
+    return f"{value:,.3f}".rstrip("0").rstrip(".")
+
+def _overlay(name: str | None, total, count) -> dict:
+    display_name = None if name is None else f"{name} ({count} txns, ${format_amount(total)})"
+    return {"totalAmount": total, "txCount": count, "display_name": display_name}
+
+def _measure(values: list):
+    values = [0 if v is None else v for v in values]
+    if all(isinstance(v, int) and not isinstance(v, bool) for v in values):
+        return np.array(values, dtype=np.int64)
+    return np.array(values, dtype=np.float64)
+
+def _ranked(ids: list[str]) -> tuple:
+    """Returns the IDs sorted, and the rank of each ID in that order (for tie-breaking and cursors)."""
+    ids = np.array(ids, dtype=str)
+    order = np.argsort(ids, kind="stable")
+    ranks = np.empty(len(ids), dtype=np.int64)
+    ranks[order] = np.arange(len(ids))
+    return ids[order], ranks
+
+class _RollupData:
+    """Immutable arrays of one load: fact measures, month and dimension codes, and the dimension nodes."""
+
+    def __init__(self, fact_rows: list, dimension_rows: list):
+        self.nodes: dict[str, list[RollupNode]] = {label: [] for label in LABELS}
+        self.index: dict[str, dict[str, int]] = {label: {} for label in LABELS}
+        for element_id, labels, properties in dimension_rows:
+            node = RollupNode(element_id, labels, properties)
+            for label in labels:
+                if label in self.index:
+                    self.index[label][element_id] = len(self.nodes[label])
+                    self.nodes[label].append(node)
+        self.sorted_ids, self.ranks = {}, {}
+        for label in LABELS:
+            self.sorted_ids[label], self.ranks[label] = _ranked([n.element_id for n in self.nodes[label]])
+
+        self.fact_ids = [row[0] for row in fact_rows]
+        self.sorted_fact_ids, self.fact_ranks = _ranked(self.fact_ids)
+        self.months, self.month_codes = np.unique(np.array([row[1] or "" for row in fact_rows], dtype=str), return_inverse=True)
+        self.total = _measure([row[2] for row in fact_rows])
+        self.count = _measure([row[3] for row in fact_rows])
+        # Dimension codes index into self.nodes[label]; -1 marks a missing dimension.
+        self.codes = {
+            label: np.array([self.index[label].get(row[4 + i], -1) for row in fact_rows], dtype=np.int64)
+            for i, label in enumerate(LABELS)
+        }
+        # Per dimension, the facts sorted by its code, so the facts of one
+        # dimension node are a contiguous slice found by binary search.
+        self.by_dimension = {}
+        for label, codes in self.codes.items():
+            order = np.argsort(codes, kind="stable")
+            self.by_dimension[label] = (order, codes[order])
+        # Client masks by text search; matching scans every client name.
+        self._client_masks: dict[str | None, "np.ndarray"] = {}
+        self._client_masks_lock = threading.Lock()
+
+    def window_codes(self, months) -> "np.ndarray":
+        wanted = set(month_window(int(months)))
+        return np.array([i for i, month in enumerate(self.months) if month in wanted], dtype=np.int64)
+
+    def month_mask(self, months) -> "np.ndarray":
+        return np.isin(self.month_codes, self.window_codes(months))
+
+    def facts_of(self, label: str, code: int) -> "np.ndarray":
+        order, sorted_codes = self.by_dimension[label]
+        low, high = np.searchsorted(sorted_codes, [code, code + 1])
+        return order[low:high]
+
+    def client_matches(self, text_search: str | None) -> "np.ndarray":
+        """Per client code, whether it passes the text search; the extra last entry (for code -1) is False."""
+        matches = self._client_masks.get(text_search)
+        if matches is not None:
+            return matches
+        clients = self.nodes["Client"]
+        if text_search is None:
+            matches = np.ones(len(clients) + 1, dtype=bool)
+        else:
+            matches = np.array([
+                (n.get("name") is not None and text_search in n.get("name")) or n.get("clientId") == text_search
+                for n in clients
+            ] + [False], dtype=bool)
+        matches[-1] = False
+        matches.flags.writeable = False
+        with self._client_masks_lock:
+            if len(self._client_masks) >= CLIENT_MASK_CACHE_SIZE:
+                # Drops the oldest entry; searches are rarely repeated long after.
+                self._client_masks.pop(next(iter(self._client_masks)))
+            self._client_masks[text_search] = matches
+        return matches
+
+    def group_sum(self, codes: "np.ndarray", measure: "np.ndarray", size: int | None = None) -> "np.ndarray":
+        sums = np.bincount(codes, weights=measure, minlength=size or 0)
+        return np.rint(sums).astype(np.int64) if measure.dtype.kind == "i" else sums
+
+def _after_cursor(candidates: "np.ndarray", values: "np.ndarray", ranks: "np.ndarray", sorted_ids: "np.ndarray", params: dict) -> "np.ndarray":
+    """Keeps the candidates that sort after the keyset cursor in $cursor_sort/$cursor_id (value descending, ID ascending)."""
+    cursor_id = params.get("cursor_id")
+    if cursor_id is None:
+        return candidates
+    cursor_sort = params.get("cursor_sort")
+    first_after = np.searchsorted(sorted_ids, cursor_id, side="right")
+    keep = (values < cursor_sort) | ((values == cursor_sort) & (ranks >= first_after))
+    return candidates[keep]
+
+class RollupEngine:
+    """
+    Answers the month-window aggregations of the AggTx query sets from
+    memory. The fact table and dimension nodes are loaded once (and again on
+    refresh) into NumPy arrays; each query is then a mask over the month
+    window and a vectorized group-by sum, instead of a graph traversal.
+
+    The results have the same columns, ordering and pagination as the
+    client_360_view Cypher queries, with stand-in node and relationship
+    objects, so they flow through the graph builder and serializers
+    unchanged. Until a load has finished, `ready` is False and callers use
+    Cypher.
+    """
+
+    def __init__(self):
+        self._data: _RollupData | None = None
+        self._lock = asyncio.Lock()
+        self.loaded_at: float | None = None
+        self.load_seconds: float | None = None
+
+    @property
+    def ready(self) -> bool:
+        return self._data is not None
+
+    async def load(self, driver: AsyncDriver) -> None:
+        """Reads all facts and dimension nodes in one read transaction and swaps in the new arrays."""
+        if np is None:
+            raise RuntimeError("The rollup engine needs NumPy; install it with `pip install numpy`.")
+        async with self._lock:
+            start = time.perf_counter()
+
+            async def work(tx):
+                facts = await (await tx.run(FACTS_QUERY)).values()
+                dimensions = await (await tx.run(DIMENSIONS_QUERY)).values()
+                return facts, dimensions
+
+            async with driver.session(default_access_mode=READ_ACCESS) as session:
+                facts, dimensions = await session.execute_read(work)
+            # Building the arrays is CPU-bound; keep the event loop free meanwhile.
+            self._data = await asyncio.to_thread(_RollupData, facts, dimensions)
+            self.loaded_at = time.time()
+            self.load_seconds = time.perf_counter() - start
+            logger.info(f"Loaded {len(facts)} AggTx facts into the rollup engine in {self.load_seconds:.1f}s.")
+
+    def stats(self) -> dict:
+        data = self._data
+        return {
+            "ready": data is not None,
+            "facts": len(data.fact_ids) if data else 0,
+            "dimensions": {label: len(data.nodes[label]) for label in LABELS} if data else {},
+            "loaded_at": self.loaded_at,
+            "load_seconds": self.load_seconds,
+        }
+
+    def primary(self, params: dict) -> tuple[list[Record], list[str]]:
+        """Clients matching the text search with their totals over the month window, largest first."""
+        data = self._data
+        clients = data.codes["Client"]
+        mask = data.month_mask(params.get("months", 1)) & (clients >= 0)
+        size = len(data.nodes["Client"])
+        totals = data.group_sum(clients[mask], data.total[mask], size)
+        counts = data.group_sum(clients[mask], data.count[mask], size)
+
+        selected = np.nonzero(data.client_matches(params.get("text_search"))[:-1])[0]
+        ranks = data.ranks["Client"]
+        selected = _after_cursor(selected, totals[selected], ranks[selected], data.sorted_ids["Client"], params)
+        selected = selected[np.lexsort((ranks[selected], -totals[selected]))][:int(params.get("limit", 10))]
+
+        keys = ["n", "overlay"]
+        records = []
+        for code, total, count in zip(selected.tolist(), totals[selected].tolist(), counts[selected].tolist()):
+            node = data.nodes["Client"][code]
+            records.append(Record(zip(keys, (node, _overlay(node.get("name"), total, count)))))
+        return records, keys
+
+    def table(self, params: dict) -> tuple[list[Record], list[str]]:
+        """One row per fact in the month window whose client matches the text search, largest amount first."""
+        data = self._data
+        mask = data.month_mask(params.get("months", 1)) & data.client_matches(params.get("text_search"))[data.codes["Client"]]
+        for label in LABELS:
+            mask &= data.codes[label] >= 0
+        candidates = np.nonzero(mask)[0]
+        candidates = _after_cursor(candidates, data.total[candidates], data.fact_ranks[candidates], data.sorted_fact_ids, params)
+        order = np.lexsort((data.fact_ranks[candidates], -data.total[candidates]))
+        candidates = candidates[order][:int(params.get("limit", 10))]
+
+        records = []
+        for i in candidates.tolist():
+            names = [data.nodes[label][data.codes[label][i]].get(prop) for label, _, prop, *_ in DIMENSIONS]
+            values = names + [str(data.months[data.month_codes[i]]), data.total[i].item(), data.count[i].item(), data.fact_ids[i]]
+            records.append(Record(zip(TABLE_KEYS, values)))
+        return records, list(TABLE_KEYS)
+
+    def neighbors(self, label: str, rows: list[dict], params: dict) -> tuple[list[Record], list[str]]:
+        """
+        The children of each parent in `rows` (its `node_id` and the
+        `<Label>_node_id` of its ancestors) one level down the drill-down
+        chain, with totals over the month window. Rows carrying `__parent`
+        get it as a leading column, like the batched neighbor queries.
+        Labels without their own level (e.g. `_default`) expand as a Client.
+        """
+        data = self._data
+        position = LABELS.index(label) if label in LABELS else 0
+        parent_column, child_column = DIMENSIONS[position][3], DIMENSIONS[min(position + 1, len(LABELS) - 1)][3]
+        batched = any("__parent" in row for row in rows)
+        keys = (["__parent"] if batched else []) + [parent_column, "rel", child_column, "overlay"]
+        if position + 1 >= len(LABELS):
+            return [], keys
+        parent_label, child_label = LABELS[position], LABELS[position + 1]
+        child_prop = DIMENSIONS[position + 1][2]
+
+        window = data.window_codes(params.get("months", 1))
+
+        records = []
+        for row in rows:
+            code = data.index[parent_label].get(row.get("node_id"))
+            if code is None:
+                continue
+            # A fact of the parent counts if it is in the window, has a child
+            # and belongs to the same ancestors (which the query's pattern
+            # also requires to exist).
+            selected = data.facts_of(parent_label, code)
+            selected = selected[np.isin(data.month_codes[selected], window) & (data.codes[child_label][selected] >= 0)]
+            for ancestor in LABELS[:position]:
+                ancestor_code = data.index[ancestor].get(row.get(f"{ancestor}_node_id"))
+                if ancestor_code is None:
+                    selected = selected[:0]
+                    break
+                selected = selected[data.codes[ancestor][selected] == ancestor_code]
+            if not selected.size:
+                continue
+            children = data.codes[child_label][selected]
+            totals = data.group_sum(children, data.total[selected])
+            counts = data.group_sum(children, data.count[selected])
+            parent = data.nodes[parent_label][code]
+            for child_code in np.unique(children).tolist():
+                child = data.nodes[child_label][child_code]
+                total, count = totals[child_code].item(), counts[child_code].item()
+                rel = RollupRelationship(f"rollup-{next(_relationship_ids)}", parent, child, {"totalAmount": total, "txCount": count})
+                values = (parent, rel, child, _overlay(child.get(child_prop), total, count))
+                records.append(Record(zip(keys, ((row["__parent"],) + values) if batched else values)))
+        return records, keys
+
+_engine: RollupEngine | None = None
+
+def get_rollup_engine() -> RollupEngine:
+    """Returns the singleton rollup engine, creating it (unloaded) if necessary."""
+    global _engine
+    if _engine is None:
+        _engine = RollupEngine()
+    return _engine
@@ -0,0 +1,140 @@
+import datetime
+from typing import Any, Callable
+import orjson
+from fastapi.responses import JSONResponse
+from neo4j import Record
+from neo4j.graph import Node, Path, Relationship
+from neo4j.spatial import Point
+from neo4j.time import Date, Time, DateTime, Duration
+
+_PRIMITIVES = frozenset((str, int, float, bool, type(None)))
+
+def _identity(value: Any) -> Any:
+    return value
+
+def _serialize_properties(items) -> dict:
+    # Most property values are primitives; skip the dispatch call for them.
+    return {k: v if type(v) in _PRIMITIVES else serialize_value(v) for k, v in items}
+
+def _serialize_node(node: Node) -> dict:
+    return {
+        "_type": "node",
+        "_labels": list(node.labels),
+        "properties": _serialize_properties(node.items())
+    }
+
+def _serialize_relationship(rel: Relationship) -> dict:
+    return {
+        "_type": "relationship",
+        "_relation_type": rel.type,
+        "properties": _serialize_properties(rel.items())
+    }
+
+def _serialize_path(path: Path) -> dict:
+    return {
+        "_type": "path",
+        "nodes": [_serialize_node(n) for n in path.nodes],
+        "relationships": [_serialize_relationship(r) for r in path.relationships]
+    }
+
+def _serialize_point(point: Point) -> dict:
+    return {"srid": point.srid, "x": point.x, "y": point.y, "z": getattr(point, "z", None)}
+
+def _serialize_list(values: list | tuple) -> list:
+    return [serialize_value(v) for v in values]
+
+def _serialize_map(values: dict) -> dict:
+    return _serialize_properties(values.items())
+
+def _serialize_temporal(value: Any) -> str:
+    return str(value)
+
+def _serialize_native_temporal(value: datetime.date | datetime.time) -> str:
+    return value.isoformat()
+
+# Exact-type dispatch table. Subclasses (e.g. the per-type Relationship classes
+# the driver creates, or CartesianPoint/WGS84Point) are resolved once through
+# their MRO in _resolve() and then cached here.
+_SERIALIZERS: dict[type, Callable[[Any], Any]] = {
+    str: _identity,
+    int: _identity,
+    float: _identity,
+    bool: _identity,
+    type(None): _identity,
+    list: _serialize_list,
+    tuple: _serialize_list,
+    dict: _serialize_map,
+    Node: _serialize_node,
+    Relationship: _serialize_relationship,
+    Path: _serialize_path,
+    Point: _serialize_point,
+    Date: _serialize_temporal,
+    Time: _serialize_temporal,
+    DateTime: _serialize_temporal,
+    Duration: _serialize_temporal,
+    datetime.date: _serialize_native_temporal,
+    datetime.datetime: _serialize_native_temporal,
+    datetime.time: _serialize_native_temporal,
+    datetime.timedelta: _serialize_temporal,
+    bytes: list,
+}
+
+def _resolve(value_type: type) -> Callable[[Any], Any]:
+    for base in value_type.__mro__[1:]:
+        serializer = _SERIALIZERS.get(base)
+        if serializer is not None:
+            _SERIALIZERS[value_type] = serializer
+            return serializer
+    _SERIALIZERS[value_type] = _identity
+    return _identity
+
+def register(value_type: type, like: type) -> None:
+    """Serializes `value_type` the same way as the supported type `like` (e.g. a stand-in for a driver type)."""
+    _SERIALIZERS[value_type] = _SERIALIZERS[like]
+
+def serialize_value(value: Any) -> Any:
+    """Converts any value returned by the Neo4j driver into plain JSON-compatible Python data."""
+    serializer = _SERIALIZERS.get(type(value))
+    if serializer is None:
+        serializer = _resolve(type(value))
+    return serializer(value)
+
+def serialize_record(record: Record, keys: list[str] | None = None) -> dict:
+    """Converts a single Neo4j Record into a JSON-serializable dict."""
+    return _serialize_properties(zip(keys or record.keys(), record))
+
+def serialize_records(records: list[Record]) -> list[dict]:
+    """Converts a list of Neo4j Records into a JSON-serializable format."""
+    if not records:
+        return []
+    # All records of one result share the same keys; read them once.
+    keys = records[0].keys()
+    return [_serialize_properties(zip(keys, record)) for record in records]
+
+def encoder_default(value: Any) -> Any:
+    """
+    The `default` hook of the orjson and msgpack encoders: converts a value
+    they cannot encode themselves with the dispatch table, or raises
+    TypeError if it has no serializer.
+    """
+    serializer = _SERIALIZERS.get(type(value)) or _resolve(type(value))
+    if serializer is _identity:
+        raise TypeError(f"Type is not serializable: {type(value).__name__}")
+    return serializer(value)
+
+def dumps(content: Any) -> bytes:
+    """
+    Serializes content to JSON bytes with orjson. Driver types that were not
+    converted up front (nodes, temporal values, ...) go through the same
+    dispatch table via orjson's `default` hook.
+    """
+    return orjson.dumps(content, default=encoder_default, option=orjson.OPT_NON_STR_KEYS)
+
+class ORJSONResponse(JSONResponse):
+    """
+    A JSON response rendered by orjson. Returning it directly from an
+    endpoint also skips FastAPI's jsonable_encoder pass over the payload.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -0,0 +1,70 @@
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Awaitable, Callable, Hashable, TypeVar
+
+T = TypeVar("T")
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical async calls: while a call for a key is
+    in flight, later callers with the same key wait for its result (or its
+    exception) instead of starting their own. The call runs as its own task,
+    so a caller that is cancelled (e.g. a client disconnecting) does not
+    cancel it for the others. Completed calls are forgotten; caching results
+    is left to the caller.
+    """
+
+    def __init__(self):
+        self._calls: dict[Hashable, asyncio.Task] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> tuple[T, bool]:
+        """Returns the result of `fn()` for `key`, and whether it was shared with an earlier caller."""
+        task = self._calls.get(key)
+        shared = task is not None
+        if not shared:
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        return await asyncio.shield(task), shared
+
+    def _forget(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            # Marks the exception as retrieved, so one that no caller is
+            # left to await is not reported as never retrieved.
+            task.exception()
+
+class ThreadSingleFlight:
+    """The same as SingleFlight for blocking calls made from several threads."""
+
+    def __init__(self):
+        self._calls: dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, fn: Callable[[], T]) -> tuple[T, bool]:
+        """Returns the result of `fn()` for `key`, and whether it was shared with an earlier caller."""
+        with self._lock:
+            future = self._calls.get(key)
+            shared = future is not None
+            if not shared:
+                future = self._calls[key] = Future()
+        if not shared:
+            try:
+                future.set_result(fn())
+            except BaseException as exc:
+                future.set_exception(exc)
+            finally:
+                with self._lock:
+                    del self._calls[key]
+        return future.result(), shared
+
+_flights: SingleFlight | None = None
+
+def get_single_flight() -> SingleFlight:
+    """Returns the singleton coalescer of graph and table query executions, creating it if necessary."""
+    global _flights
+    if _flights is None:
+        _flights = SingleFlight()
+    return _flights
@@ -11,9 +11,26 @@ function setActiveQueryKey(key){ const i=document.getElementById('current-query-
     const NEIGHBORS_API_URL_TEMPLATE = '/api/nodes/{node_id}/neighbors';
     const NODE_PROPERTIES_API_URL_TEMPLATE = '/api/nodes/{node_id}/properties';
     const EDGE_PROPERTIES_API_URL_TEMPLATE = '/api/edges/{edge_id}/properties';
+    const PROPERTIES_BATCH_API_URL = '/api/properties:batch';
 
     let currentQuery = {};
 
+    // Prefetched properties, keyed by "node:<id>" / "edge:<id>". Values are
+    // promises so that a click during a pending prefetch waits for it.
+    let propertiesCache = new Map();
+
+    // Keyset pagination state of the current search. Cursors are null once
+    // the last page has been loaded; baseQuery keeps the first page's
+    // parameters so later pages continue the same result.
+    let pagination = { baseQuery: '', graphCursor: null, tableCursor: null, tableRecords: [], tableKeys: [] };
+
+    // Last response per graph request (the search of a query set, or the
+    // expansion of one node to one depth), whatever the months: its ETag is
+    // sent back so an unchanged result comes back as 304 and a changed one as
+    // a delta against it. Oldest entries are dropped beyond the limit.
+    const graphVersions = new Map();
+    const GRAPH_VERSIONS_LIMIT = 200;
+
     // --- Element References ---
     const cyContainer = document.getElementById('cy');
     const loader = document.getElementById('loader');
@@ -22,6 +39,8 @@ function setActiveQueryKey(key){ const i=document.getElementById('current-query-
     const zoomSlider = document.getElementById('zoom-slider');
     const edgeLengthSlider = document.getElementById('edge-length-slider');
     const nodeSpacingSlider = document.getElementById('node-spacing-slider');
+    const expandDepthSlider = document.getElementById('expand-depth-slider');
+    const expandDepthLabel = document.getElementById('expand-depth-label');
     const queryTitle = document.getElementById('query-title');
     const textSearchInput = document.getElementById('text-search-input');
     const limitInput = document.getElementById('limit-input');
@@ -32,6 +51,7 @@ function setActiveQueryKey(key){ const i=document.getElementById('current-query-
     const timescaleSlider = document.getElementById('timescale-slider');
     const timescaleLabel = document.getElementById('timescale-label');
     const downloadCsvButton = document.getElementById('download-csv-button'); 
+    const loadMoreButton = document.getElementById('load-more-button');
     
     // --- Fullscreen Elements ---
     const fullscreenButton = document.getElementById('fullscreen-button');
@@ -402,37 +422,181 @@ function setActiveQueryKey(key){ const i=document.getElementById('current-query-
         });
     }
 
-    async function fetchDataAndRender(url, isDrillDown = false) {
+    // Media type of the compact columnar encoding (app/wire_format.py),
+    // requested for graph and table payloads and decoded here.
+    const COMPACT_MEDIA_TYPE = 'application/vnd.kge.compact+json';
+
+    // Rebuilds one data object per row from parallel column arrays; null
+    // stands for a missing key.
+    function decodeColumns(block, count) {
+        const rows = Array.from({ length: count }, () => ({}));
+        Object.entries(block.columns || {}).forEach(([key, values]) => {
+            values.forEach((value, i) => { if (value !== null) rows[i][key] = value; });
+        });
+        Object.entries(block.maps || {}).forEach(([key, { keys, rows: values }]) => {
+            values.forEach((value, i) => {
+                if (value !== null) rows[i][key] = Object.fromEntries(keys.map((k, j) => [k, value[j]]));
+            });
+        });
+        return rows;
+    }
+
+    function decodeCompactElements(compact) {
+        const { labels, eids, prefixes, nodes, edges } = compact;
+        const ids = new Array(nodes.id.length);
+        const nodeId = i => {
+            if (ids[i] === undefined) {
+                const id = nodes.id[i];
+                const eid = eids[nodes.oid[i]];
+                ids[i] = id === null ? eid : typeof id === 'number' ? `${refId(id)}_${eid}` : id;
+            }
+            return ids[i];
+        };
+        const refId = ref => ref >= 0 ? nodeId(ref) : prefixes[-1 - ref];
+        const elements = decodeColumns(nodes, nodes.id.length).map((data, i) => {
+            data.id = nodeId(i);
+            if (nodes.label[i] !== null) data.label = labels[nodes.label[i]];
+            if (nodes.oid[i] !== null) data.original_element_id = eids[nodes.oid[i]];
+            return nodes.x && nodes.x[i] !== null ? { data, position: { x: nodes.x[i], y: nodes.y[i] } } : { data };
+        });
+        decodeColumns(edges, edges.source.length).forEach((data, i) => {
+            data.source = refId(edges.source[i]);
+            data.target = refId(edges.target[i]);
+            if (edges.label[i] !== null) data.label = labels[edges.label[i]];
+            data.id = edges.id ? edges.id[i] : `${data.source}-${data.label}->${eids[nodes.oid[edges.target[i]]]}`;
+            elements.push({ data });
+        });
+        return elements;
+    }
+
+    function decodeCompactTable(table) {
+        const { rows, ...rest } = table;
+        return { ...rest, records: rows.map(row => Object.fromEntries(table.keys.map((key, i) => [key, row[i]]))) };
+    }
+
+    // Turns a compact response back into the plain JSON payload shape.
+    function decodeCompactPayload(response, payload) {
+        if (!(response.headers.get('Content-Type') || '').startsWith(COMPACT_MEDIA_TYPE)) return payload;
+        if (payload.rows) return decodeCompactTable(payload);
+        const data = { ...payload };
+        if (data.graph) data.graph = decodeCompactElements(data.graph);
+        if (data.delta) {
+            data.delta = { ...data.delta, added: decodeCompactElements(data.delta.added), updated: decodeCompactElements(data.delta.updated) };
+        }
+        if (data.table) data.table = decodeCompactTable(data.table);
+        return data;
+    }
+
+    async function fetchPayload(url, headers = {}) {
+        const response = await fetch(url, { headers: { Accept: COMPACT_MEDIA_TYPE, ...headers } });
+        if (response.status === 304) return { response, data: null };
+        if (!response.ok) throw new Error(`HTTP error! status: ${response.status}`);
+        return { response, data: decodeCompactPayload(response, await response.json()) };
+    }
+
+    function applyDelta(elements, delta) {
+        const removed = new Set(delta.removed);
+        const updated = new Map(delta.updated.map(element => [element.data.id, element]));
+        return elements
+            .filter(element => !removed.has(element.data.id))
+            .map(element => updated.get(element.data.id) || element)
+            .concat(delta.added);
+    }
+
+    // Fetches a graph payload, revalidating the last version stored under
+    // versionKey. Returns the full payload whether the server sent it whole,
+    // as a delta, or not at all (304).
+    async function fetchGraph(url, versionKey) {
+        const known = graphVersions.get(versionKey);
+        const headers = {};
+        if (known) {
+            headers['If-None-Match'] = known.etag;
+            url += `&delta_base=${encodeURIComponent(known.etag)}`;
+        }
+        let { response, data } = await fetchPayload(url, headers);
+        if (response.status === 304) return known.data;
+        if (data.delta) {
+            const { delta, ...rest } = data;
+            data = { ...rest, graph: applyDelta(known.data.graph, delta) };
+        }
+        const etag = response.headers.get('ETag');
+        graphVersions.delete(versionKey);
+        if (etag) graphVersions.set(versionKey, { etag, data });
+        if (graphVersions.size > GRAPH_VERSIONS_LIMIT) graphVersions.delete(graphVersions.keys().next().value);
+        return data;
+    }
+
+    // Adds elements to the canvas; elements already on it get the new data
+    // instead. With replace, everything else is removed, so the canvas shows
+    // exactly these elements while unchanged ones keep their rendering.
+    // Positions computed by the server (LAYOUT_ENABLED) are offset by
+    // origin: drill-down results are placed relative to the expanded node.
+    function mergeElements(elements, replace, origin = { x: 0, y: 0 }) {
+        if (replace) {
+            const ids = new Set(elements.map(element => element.data.id));
+            cy.remove(cy.elements().filter(element => !ids.has(element.id())));
+        }
+        const toAdd = [];
+        cy.batch(() => {
+            elements.forEach(element => {
+                const existing = cy.getElementById(element.data.id);
+                const position = element.position && { x: element.position.x + origin.x, y: element.position.y + origin.y };
+                if (existing.empty()) {
+                    toAdd.push(position ? { ...element, position } : element);
+                } else {
+                    existing.data({ _expanded: false, ...element.data });
+                    if (replace && position) existing.position(position);
+                }
+            });
+        });
+        return cy.add(toAdd);
+    }
+
+    // Returns the added elements, and whether the server laid them out (in
+    // which case the client-side layout is not run).
+    async function fetchDataAndRender(url, isDrillDown, versionKey, origin) {
         showLoader();
         cyContainer.style.opacity = 0.5;
         try {
-            const response = await fetch(url);
-            if (!response.ok) throw new Error(`HTTP error! status: ${response.status}`);
-            const data = await response.json();
+            const data = await fetchGraph(url, versionKey);
             
             // data payload is: { "graph": ..., "table": ... }
             
-            const addedElements = cy.add(data.graph);
+            const addedElements = mergeElements(data.graph, !isDrillDown, origin);
+            const positioned = data.graph.some(element => element.position);
             updateLegend();
+            prefetchProperties(addedElements);
     
             // Only update the table on the *initial search*, not on graph drill-down
             if (!isDrillDown) {
                 populateDataTable(data.table.records, data.table.keys);
+                pagination.graphCursor = data.has_more ? data.next_cursor : null;
+                pagination.tableCursor = data.table.has_more ? data.table.next_cursor : null;
+                pagination.tableRecords = data.table.records;
+                pagination.tableKeys = data.table.keys;
+                updateLoadMoreButton();
             }
     
-            return addedElements;
+            return { addedElements, positioned };
         } catch (error) {
             console.error("Failed to fetch graph data:", error);
             if (!isDrillDown) {
+                cy.elements().remove();
                 populateDataTable([], []);
+                pagination.graphCursor = pagination.tableCursor = null;
+                updateLoadMoreButton();
             }
-            return cy.collection();
+            return { addedElements: cy.collection(), positioned: false };
         } finally {
             hideLoader();
             cyContainer.style.opacity = 1;
         }
     }
 
+    expandDepthSlider.addEventListener('input', () => {
+        expandDepthLabel.textContent = expandDepthSlider.value;
+    });
+
     timescaleSlider.addEventListener('input', () => {
         const months = parseInt(timescaleSlider.value);
         timescaleLabel.textContent = `Last ${months} month(s)`;
@@ -442,7 +606,7 @@ function setActiveQueryKey(key){ const i=document.getElementById('current-query-
         currentQuery = query;
         labelColorMap = query.colors || {}; // Load the static color map
         try { setActiveQueryKey(query.name); } catch(e) {}
-        cy.elements().remove();
+        propertiesCache = new Map();
         propertiesTitle.textContent = "Properties";
         propertiesPanel.innerHTML = `<p>Click a node or edge to see its properties.</p>`;
         
@@ -450,15 +614,23 @@ function setActiveQueryKey(key){ const i=document.getElementById('current-query-
         const textSearch = textSearchInput.value;
         const months = parseInt(timescaleSlider.value);
 
-        let searchUrl = SEARCH_API_URL_TEMPLATE.replace('{query_name}', query.name) + `?limit=${limit}&months=${months}`;
+        let baseQuery = `?limit=${limit}&months=${months}`;
         if (textSearch) {
-            searchUrl += `&text_search=${encodeURIComponent(textSearch)}`;
+            baseQuery += `&text_search=${encodeURIComponent(textSearch)}`;
         }
+        pagination.baseQuery = baseQuery;
+        const searchUrl = SEARCH_API_URL_TEMPLATE.replace('{query_name}', query.name) + baseQuery;
         
-        await fetchDataAndRender(searchUrl, false); 
+        // The canvas is replaced by the new results; elements that are still
+        // part of them stay in place.
+        const { positioned } = await fetchDataAndRender(searchUrl, false, `search:${query.name}`);
         calculateRelativeSizes();
         handleZoom();
-        reRunLayout();
+        if (positioned) {
+            cy.fit(undefined, 30);
+        } else {
+            reRunLayout();
+        }
         
         document.querySelectorAll('#query-list li').forEach(li => {
             if (li.dataset.queryName === query.name) {
@@ -470,7 +642,51 @@ function setActiveQueryKey(key){ const i=document.getElementById('current-query-
         });
     }
 
+    function updateLoadMoreButton() {
+        loadMoreButton.style.display = (pagination.graphCursor || pagination.tableCursor) ? 'block' : 'none';
+    }
+
+    /**
+     * Fetches the next page of the current search: graph results and table
+     * rows continue from their own cursors. New elements are added to the
+     * graph and new rows appended to the table.
+     */
+    async function loadMorePage() {
+        if (!currentQuery.name) return;
+        const searchUrl = SEARCH_API_URL_TEMPLATE.replace('{query_name}', currentQuery.name);
+        const { graphCursor, tableCursor } = pagination;
+        showLoader();
+        try {
+            let tablePage = null;
+            if (graphCursor) {
+                let url = searchUrl + pagination.baseQuery + `&cursor=${encodeURIComponent(graphCursor)}`;
+                url += tableCursor ? `&table_cursor=${encodeURIComponent(tableCursor)}` : '&table=false';
+                const { data } = await fetchPayload(url);
+                const addedElements = mergeElements(data.graph, false);
+                updateLegend();
+                prefetchProperties(addedElements);
+                calculateRelativeSizes();
+                reRunLayout();
+                pagination.graphCursor = data.has_more ? data.next_cursor : null;
+                if (tableCursor) tablePage = data.table;
+            } else if (tableCursor) {
+                ({ data: tablePage } = await fetchPayload(searchUrl + '/table' + pagination.baseQuery + `&cursor=${encodeURIComponent(tableCursor)}`));
+            }
+            if (tablePage) {
+                pagination.tableRecords = pagination.tableRecords.concat(tablePage.records);
+                pagination.tableCursor = tablePage.has_more ? tablePage.next_cursor : null;
+                populateDataTable(pagination.tableRecords, pagination.tableKeys);
+            }
+        } catch (error) {
+            console.error("Failed to load the next page:", error);
+        } finally {
+            hideLoader();
+            updateLoadMoreButton();
+        }
+    }
+
     searchButton.addEventListener('click', () => { if (currentQuery.name) loadGraph(currentQuery); });
+    loadMoreButton.addEventListener('click', loadMorePage);
     textSearchInput.addEventListener('keyup', (event) => { if (event.key === 'Enter') searchButton.click(); });
     downloadCsvButton.addEventListener('click', downloadTableAsCSV);
 
@@ -598,7 +814,7 @@ function setActiveQueryKey(key){ const i=document.getElementById('current-query-
         } else {
             // --- EXPAND LOGIC (REBUILT) ---
             
-            const nodeId = node.id(); // This is the synthetic ID (e.g., "rel_node")
+            const nodeId = node.id(); // This is the synthetic ID (e.g., "parent_node")
             const nodeType = node.data('label');
             
             // --- Build history DYNAMICALLY from predecessors ---
@@ -625,18 +841,21 @@ function setActiveQueryKey(key){ const i=document.getElementById('current-query-
                 .join('&');
 
             const months = parseInt(timescaleSlider.value);
+            // Levels to drill down in one request; the server marks intermediate nodes as expanded
+            const depth = parseInt(expandDepthSlider.value);
             
             // Call the API using the SYNTHETIC ID (nodeId) in the URL
             // The backend will parse this nodeId to get the "real_node_id" for the $node_id param
             let neighborsUrl = NEIGHBORS_API_URL_TEMPLATE.replace('{node_id}', nodeId) 
-                + `?limit=10&node_type=${nodeType}&query_key=${encodeURIComponent(document.getElementById('current-query-key')?.value || '')}&months=${months}`;
+                + `?limit=10&node_type=${nodeType}&query_key=${encodeURIComponent(document.getElementById('current-query-key')?.value || '')}&months=${months}&depth=${depth}`;
             
             if (historyParams) {
                 neighborsUrl += `&${historyParams}`;
             }
             
             // Fetch and add the new elements
-            const addedElements = await fetchDataAndRender(neighborsUrl, true);
+            const versionKey = `neighbors:${currentQuery.name}:${nodeId}:${depth}`;
+            const { addedElements, positioned } = await fetchDataAndRender(neighborsUrl, true, versionKey, node.position());
             
             // Only mark as expanded if we actually added something
             if (addedElements.length > 0) {
@@ -644,15 +863,66 @@ function setActiveQueryKey(key){ const i=document.getElementById('current-query-
             }
 
             calculateRelativeSizes();
-            reRunLayout(); 
+            if (!positioned) reRunLayout();
             handleZoom();
         }
     });
 
+    function propertiesCacheKey(element) {
+        // Use the original_element_id if it exists, otherwise fall back to the element's ID
+        return `${element.isNode() ? 'node' : 'edge'}:${element.data('original_element_id') || element.id()}`;
+    }
+
+    // Fetches the properties of all given elements in one batch request.
+    function prefetchProperties(elements) {
+        const nodeIds = [], edgeIds = [];
+        elements.forEach(element => {
+            if (!element.data('label') || propertiesCache.has(propertiesCacheKey(element))) return;
+            if (element.isNode()) nodeIds.push(element.data('original_element_id') || element.id());
+            else if (element.data('original_element_id')) edgeIds.push(element.data('original_element_id'));
+        });
+        if (nodeIds.length === 0 && edgeIds.length === 0) return;
+
+        const batch = fetch(PROPERTIES_BATCH_API_URL, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ node_ids: nodeIds, edge_ids: edgeIds })
+        })
+            .then(response => response.ok ? response.json() : null)
+            .catch(error => {
+                console.error("Failed to prefetch properties:", error);
+                return null;
+            });
+        nodeIds.forEach(id => propertiesCache.set(`node:${id}`, batch.then(result => result ? result.nodes[id] : undefined)));
+        edgeIds.forEach(id => propertiesCache.set(`edge:${id}`, batch.then(result => result ? result.edges[id] : undefined)));
+    }
+
+    // Stored properties merged with the per-result overlay (aggregates and
+    // captions computed by the query, which are not stored on the node).
     async function fetchElementProperties(element) {
+        const props = await fetchStoredProperties(element);
+        const overlay = element.data('overlay');
+        return props && overlay ? Object.assign({}, props, overlay) : props;
+    }
+
+    async function fetchStoredProperties(element) {
+        // Virtual relationships (e.g. AGG_TO) are not stored; their ID is
+        // synthetic, so show what the result itself says about them.
+        if (element.isEdge() && !element.data('original_element_id')) {
+            const { label, weight } = element.data();
+            return weight === undefined ? { label } : { label, weight };
+        }
+        const cacheKey = propertiesCacheKey(element);
+        if (propertiesCache.has(cacheKey)) {
+            const props = await propertiesCache.get(cacheKey);
+            // undefined means the prefetch failed; fall back to a single request
+            if (props !== undefined) return props;
+            propertiesCache.delete(cacheKey);
+        }
+
         // Use the original_element_id if it exists, otherwise fall back to the element's ID
         const isNode = element.isNode();
-        const id = isNode ? (element.data('original_element_id') || element.id()) : element.id();
+        const id = element.data('original_element_id') || element.id();
         
         const url = isNode ? NODE_PROPERTIES_API_URL_TEMPLATE.replace('{node_id}', id) : EDGE_PROPERTIES_API_URL_TEMPLATE.replace('{edge_id}', id);
         
@@ -0,0 +1,197 @@
+import gzip
+from typing import Any
+from . import serializers
+from .config import settings
+
+try:
+    import msgpack
+except ImportError:  # MessagePack responses are optional.
+    msgpack = None
+
+try:
+    import brotli
+except ImportError:  # Brotli compression is optional; gzip is always available.
+    brotli = None
+
+COMPACT_MEDIA_TYPE = "application/vnd.kge.compact+json"
+MSGPACK_MEDIA_TYPES = ("application/msgpack", "application/x-msgpack")
+FORMATS = ("json", "compact", "msgpack")
+
+# Element data keys that are encoded by the compact format itself rather
+# than as plain columns.
+_NODE_KEYS = frozenset(("id", "label", "original_element_id"))
+_EDGE_KEYS = frozenset(("id", "source", "target", "label"))
+
+def negotiate(format: str | None, accept: str | None) -> str:
+    """
+    Picks the response format: the `format` parameter if given (json,
+    compact or msgpack), else the Accept header (the compact media type, or
+    a MessagePack type if msgpack is installed), else plain JSON.
+    """
+    if format is not None:
+        if format not in FORMATS:
+            raise ValueError(f"format must be one of {', '.join(FORMATS)}.")
+        if format == "msgpack" and msgpack is None:
+            raise ValueError("MessagePack responses need the msgpack package.")
+        return format
+    accept = accept or ""
+    if msgpack is not None and any(media_type in accept for media_type in MSGPACK_MEDIA_TYPES):
+        return "msgpack"
+    if COMPACT_MEDIA_TYPE in accept:
+        return "compact"
+    return "json"
+
+def _columns(rows: list[dict], encoded: frozenset) -> dict:
+    """
+    Encodes the remaining data keys of `rows` as parallel arrays, with null
+    where a row lacks the key (decoders drop null values). A key whose values are all maps with the same
+    keys (e.g. the overlay) is sent as those keys plus one value list per row.
+    """
+    keys = list(dict.fromkeys(k for row in rows for k in row if k not in encoded))
+    columns, maps = {}, {}
+    for key in keys:
+        values = [row.get(key) for row in rows]
+        shapes = {tuple(v) if isinstance(v, dict) else None for v in values if v is not None}
+        if len(shapes) == 1 and None not in shapes:
+            map_keys = next(iter(shapes))
+            maps[key] = {"keys": list(map_keys), "rows": [None if v is None else list(v.values()) for v in values]}
+        else:
+            columns[key] = values
+    return {"columns": columns, "maps": maps}
+
+def compact_elements(elements: list[dict]) -> dict:
+    """
+    Encodes a list of Cytoscape elements column-wise. Labels and
+    relationship types are replaced by indexes into `labels`, and element IDs
+    by indexes into `eids`. A node ID is null if it equals the node's
+    element ID, or the index of the node whose ID it extends ("<parent ID>_<element
+    ID>"; negative values index `prefixes`, for parents not in the list).
+    Edge IDs are left out when they all follow "<source>-<type>-><target
+    element ID>". Other data keys become parallel arrays (see _columns), as
+    do node positions (`x` and `y`, null for nodes without one).
+    """
+    labels: dict[str, int] = {}
+    eids: dict[str, int] = {}
+    prefixes: dict[str, int] = {}
+    node_elements = [e for e in elements if "source" not in e["data"]]
+    nodes = [e["data"] for e in node_elements]
+    edges = [e["data"] for e in elements if "source" in e["data"]]
+    positions = {data["id"]: i for i, data in enumerate(nodes)}
+
+    def label_code(label: str | None) -> int | None:
+        return None if label is None else labels.setdefault(label, len(labels))
+
+    def ref(node_id: str) -> int:
+        position = positions.get(node_id)
+        return position if position is not None else -1 - prefixes.setdefault(node_id, len(prefixes))
+
+    node_ids, oids = [], []
+    for data in nodes:
+        node_id, eid = data["id"], data.get("original_element_id")
+        oids.append(None if eid is None else eids.setdefault(eid, len(eids)))
+        if eid is None:
+            node_ids.append(node_id)
+        elif node_id == eid:
+            node_ids.append(None)
+        elif node_id.endswith(f"_{eid}"):
+            node_ids.append(ref(node_id[:-len(eid) - 1]))
+        else:
+            node_ids.append(node_id)
+
+    node_labels = [label_code(data.get("label")) for data in nodes]
+    sources = [ref(data["source"]) for data in edges]
+    targets = [ref(data["target"]) for data in edges]
+    edge_block = {"source": sources, "target": targets, "label": [label_code(data.get("label")) for data in edges]}
+    derived = all(
+        target >= 0 and nodes[target].get("original_element_id") is not None
+        and data["id"] == f"{data['source']}-{data.get('label')}->{nodes[target]['original_element_id']}"
+        for data, target in zip(edges, targets)
+    )
+    if not derived:
+        edge_block["id"] = [data["id"] for data in edges]
+
+    node_block = {"id": node_ids, "oid": oids, "label": node_labels}
+    if any("position" in e for e in node_elements):
+        node_block["x"] = [e["position"]["x"] if "position" in e else None for e in node_elements]
+        node_block["y"] = [e["position"]["y"] if "position" in e else None for e in node_elements]
+    return {
+        "format": "compact",
+        "labels": list(labels),
+        "eids": list(eids),
+        "prefixes": list(prefixes),
+        "nodes": {**node_block, **_columns(nodes, _NODE_KEYS)},
+        "edges": {**edge_block, **_columns(edges, _EDGE_KEYS)},
+    }
+
+def compact_table(table: dict) -> dict:
+    """Replaces the table's records (one map per row) by `rows`, lists of values in the order of `keys`."""
+    keys = table.get("keys", [])
+    compact = {k: v for k, v in table.items() if k != "records"}
+    compact["rows"] = [[record.get(key) for key in keys] for record in table.get("records", [])]
+    return compact
+
+def compact_content(content: dict) -> dict:
+    """
+    Applies the compact encoding to the graph, delta and table parts of a
+    response payload, or to the payload itself if it is a table.
+    """
+    if "records" in content:
+        return compact_table(content)
+    compact = dict(content)
+    if "graph" in compact:
+        compact["graph"] = compact_elements(compact["graph"])
+    if "delta" in compact:
+        delta = compact["delta"]
+        compact["delta"] = {**delta, "added": compact_elements(delta["added"]), "updated": compact_elements(delta["updated"])}
+    if "table" in compact:
+        compact["table"] = compact_table(compact["table"])
+    return compact
+
+def encode(content: Any, format: str) -> tuple[bytes, str]:
+    """Encodes a response payload in the negotiated format; returns the body and its media type."""
+    if format == "json":
+        return serializers.dumps(content), "application/json"
+    compact = compact_content(content)
+    if format == "msgpack":
+        return msgpack.packb(compact, use_bin_type=True, default=serializers.encoder_default), MSGPACK_MEDIA_TYPES[0]
+    return serializers.dumps(compact), COMPACT_MEDIA_TYPE
+
+def _qvalues(accept_encoding: str) -> dict[str, float]:
+    """Maps each coding listed in an Accept-Encoding header to its q-value (a malformed q counts as 0)."""
+    qvalues = {}
+    for part in accept_encoding.split(","):
+        coding, *parameters = (p.strip() for p in part.split(";"))
+        q = 1.0
+        for parameter in parameters:
+            name, _, value = parameter.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        qvalues[coding.lower()] = q
+    return qvalues
+
+def content_coding(size: int, accept_encoding: str | None) -> str | None:
+    """
+    Picks the content coding for a body of `size` bytes: brotli (if
+    installed) or gzip, whichever the client accepts first in that order
+    (a coding listed with q=0 is refused), once the body reaches
+    COMPRESSION_MIN_BYTES. None leaves it as is.
+    """
+    if settings.compression_min_bytes < 0 or size < settings.compression_min_bytes or not accept_encoding:
+        return None
+    qvalues = _qvalues(accept_encoding)
+    def accepted(coding: str) -> bool:
+        # A coding refused with q=0 stays refused even if "*" is accepted.
+        return qvalues.get(coding, qvalues.get("*", 0.0)) > 0
+    if brotli is not None and accepted("br"):
+        return "br"
+    if accepted("gzip"):
+        return "gzip"
+    return None
+
+def compress(body: bytes, coding: str) -> bytes:
+    if coding == "br":
+        return brotli.compress(body, quality=settings.compression_level)
+    return gzip.compress(body, compresslevel=min(settings.compression_level, 9))
@@ -0,0 +1 @@
+"""Offline performance benchmarks; run each module with `python -m benchmarks.<name>`."""
@@ -0,0 +1,108 @@
+"""
+End-to-end benchmarks of the repository, the serializers and the HTTP
+endpoints against the fake driver in benchmarks.fake_neo4j, using the
+client_360_view shapes from queries.yaml. Reports p50/p99 latency,
+throughput and peak traced memory per scenario and result size.
+
+    python -m benchmarks.bench_app --sizes 1000,10000,100000
+    python -m benchmarks.bench_app --sizes 1000000 --iterations 1 --json results.json
+
+The result cache is disabled so every iteration runs the full query path.
+"""
+import argparse
+import asyncio
+import logging
+from neo4j import Record
+from benchmarks.fake_neo4j import QUERY_SET, FakeDriver
+from benchmarks.harness import Result, measure, print_results, write_results
+from app import db, serializers
+from app.config import settings
+from app.repository import GraphRepository
+
+SCENARIOS = ("repository", "serializers", "endpoints")
+
+def _depth_fanout(size: int, depth: int) -> tuple[int, int]:
+    """The per-parent fanout whose `depth`-level tree has about `size` records, and that tree's record count."""
+    fanout = max(1, round(size ** (1 / depth)))
+    return fanout, sum(fanout ** level for level in range(1, depth + 1))
+
+def bench_repository(size: int, iterations: int) -> list[Result]:
+    loop = asyncio.new_event_loop()
+    results = []
+
+    def run(driver, call):
+        return lambda: loop.run_until_complete(call(GraphRepository(driver)))
+
+    try:
+        driver = FakeDriver(fanout=size)
+        results.append(measure("repository primary", size, run(driver, lambda repo: repo.execute_query(
+            QUERY_SET, "primary", {"limit": size, "months": 1})), iterations))
+        table_query = GraphRepository(driver).get_table_query(QUERY_SET)
+        results.append(measure("repository table", size, run(driver, lambda repo: repo.execute_table_query(
+            table_query, {"limit": size, "months": 1}, QUERY_SET)), iterations))
+        results.append(measure("repository neighbors depth=1", size, run(driver, lambda repo: repo.execute_query(
+            QUERY_SET, "neighbors", {"node_id": "4:bench:Client0", "node_type": "Client", "months": 1})), iterations))
+
+        fanout, records = _depth_fanout(size, 3)
+        deep_driver = FakeDriver(fanout=fanout)
+        results.append(measure("repository neighbors depth=3", records, run(deep_driver, lambda repo: repo.execute_query(
+            QUERY_SET, "neighbors", {"node_id": "4:bench:Client0", "node_type": "Client", "months": 1, "depth": 3})), iterations))
+    finally:
+        loop.close()
+    return results
+
+def bench_serializers(size: int, iterations: int) -> list[Result]:
+    keys, rows = FakeDriver().data.primary(size)
+    records = [Record(zip(keys, row)) for row in rows]
+    return [
+        measure("serialize_records", size, lambda: serializers.serialize_records(records), iterations),
+        measure("serialize_records + dumps", size, lambda: serializers.dumps(serializers.serialize_records(records)), iterations),
+    ]
+
+def bench_endpoints(size: int, iterations: int) -> list[Result]:
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    def get(client, url):
+        def call():
+            response = client.get(url)
+            response.raise_for_status()
+            return response.content
+        return call
+
+    # The test client logs every request at INFO level.
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    db._driver = FakeDriver(fanout=size)
+    with TestClient(app) as client:
+        return [
+            # The search endpoint runs the primary and the table query.
+            measure("GET /api/search", 2 * size, get(client, f"/api/search/{QUERY_SET}?limit={size}"), iterations),
+            measure("GET /api/search table=false", size, get(client, f"/api/search/{QUERY_SET}?limit={size}&table=false"), iterations),
+            measure("GET /api/search/table ndjson", size, get(client, f"/api/search/{QUERY_SET}/table?limit={size}&format=ndjson"), iterations),
+            measure("GET /api/nodes/neighbors", size, get(client, f"/api/nodes/4:bench:Client0/neighbors?node_type=Client&query_key={QUERY_SET}"), iterations),
+        ]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1000,10000,100000", help="comma-separated result sizes (records per query)")
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"comma-separated subset of {', '.join(SCENARIOS)}")
+    parser.add_argument("--json", metavar="PATH", help="also write the results to a JSON file")
+    args = parser.parse_args()
+
+    settings.cache_enabled = False
+    settings.neo4j_pool_warmup_size = 0
+    settings.slow_query_threshold_ms = float("inf")
+    runners = {"repository": bench_repository, "serializers": bench_serializers, "endpoints": bench_endpoints}
+    results = []
+    for size in (int(s) for s in args.sizes.split(",")):
+        # Deep expansions would otherwise stop at the frontier limit for large sizes.
+        settings.neighbors_max_frontier = max(settings.neighbors_max_frontier, 2 * size)
+        for name in args.scenarios.split(","):
+            results.extend(runners[name](size, args.iterations))
+    print_results(results)
+    if args.json:
+        write_results(results, args.json)
+
+if __name__ == "__main__":
+    main()
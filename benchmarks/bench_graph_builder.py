@@ -0,0 +1,152 @@
+"""
+Compares app.graph_builder.GraphBuilder against the previous per-record
+implementation of the Cytoscape conversion, for a large primary result
+and a wide neighbor (drill-down) result. The outputs are checked for
+equality before timing.
+
+    python -m benchmarks.bench_graph_builder --nodes 50000
+"""
+import argparse
+from neo4j import Record
+from neo4j.graph import Graph, Node
+from benchmarks.harness import timed
+from app.graph_builder import GraphBuilder
+
+MAPPING = {"node_size": "totalAmount", "edge_weight": "txCount"}
+CAPTION = "display_name"
+
+def make_primary_records(count: int) -> list[Record]:
+    graph = Graph()
+    return [
+        Record({"n": Node(graph, f"4:bench:{i}", i, ["Client"], {
+            "name": f"Client {i}", "totalAmount": i * 10.5, "txCount": i,
+            "display_name": f"Client {i} ({i} txns, ${i * 10.5:,.2f})",
+        })})
+        for i in range(count)
+    ]
+
+def make_neighbor_records(count: int) -> list[Record]:
+    graph = Graph()
+    rel_type = graph.relationship_type("AGG_TO")
+    parent = Node(graph, "4:bench:parent", 0, ["Client"], {"name": "Client 0"})
+    records = []
+    for i in range(count):
+        child = Node(graph, f"4:bench:{i + 1}", i + 1, ["DepositProduct"], {
+            "name": f"DP{i}", "totalAmount": i * 2.5, "txCount": i, "display_name": f"DP{i} ({i} txns)",
+        })
+        rel = rel_type(graph, f"5:bench:{i}", -i - 1, {"totalAmount": i * 2.5, "txCount": i})
+        rel._start_node, rel._end_node = parent, child
+        records.append(Record({"c": parent, "rel": rel, "dp": child}))
+    return records
+
+def legacy_build(records: list[Record], mapping: dict, caption_property: str, query_type: str, clicked_synthetic_id: str | None = None) -> list[dict]:
+    nodes, edges, parent_nodes = {}, {}, set()
+
+    node_size_prop = mapping.get("node_size")
+    node_community_prop = mapping.get("node_community")
+    edge_weight_prop = mapping.get("edge_weight")
+
+    is_neighbor_query = (query_type == "neighbors")
+
+    for record in records:
+        record_rel = None
+        record_nodes = []
+
+        # Find all relationships and nodes in the current record
+        for _, value in record.items():
+            if value is None: continue
+            if hasattr(value, 'start_node'):
+                record_rel = value
+            elif hasattr(value, 'labels'):
+                record_nodes.append(value)
+
+        # --- Primary Query (e.g., initial search) ---
+        if not is_neighbor_query:
+            for node in record_nodes:
+                node_id = node.element_id
+                if node_id not in nodes:
+                    node_label = list(node.labels)[0] if node.labels else "Node"
+                    caption = node.get(caption_property, node.get("name", node_label))
+                    node_data = {
+                        "id": node_id,
+                        "label": node_label,
+                        "name": caption,
+                        "original_element_id": node.element_id # Store for consistency
+                    }
+                    if node_size_prop and node.get(node_size_prop) is not None:
+                        node_data["size"] = node.get(node_size_prop)
+                    if node_community_prop and node.get(node_community_prop) is not None:
+                        community_id = str(node.get(node_community_prop))
+                        node_data["parent"] = community_id
+                        parent_nodes.add(community_id)
+                    nodes[node_id] = {"data": node_data}
+
+        # --- Neighbor Query (drill-down) ---
+        elif record_rel:
+            rel_type = type(record_rel).__name__
+
+            # The parent_id *must* be the ID of the node that was clicked in Cytoscape
+            parent_id = clicked_synthetic_id
+
+            # Find the child node (the one that is NOT the parent)
+            child_node = next((n for n in record_nodes if n.element_id == record_rel.end_node.element_id), None)
+
+            if child_node:
+                # Create a NEW, UNIQUE ID for the child node to force a "tree" structure
+                # This prevents collisions if the same child node is reached via different paths
+                # (path-based, as GraphBuilder builds them since delta responses)
+                unique_child_id = f"{parent_id}_{child_node.element_id}"
+                edge_id = f"{parent_id}-{rel_type}->{child_node.element_id}"
+
+                if unique_child_id not in nodes:
+                    node_label = list(child_node.labels)[0] if child_node.labels else "Node"
+                    caption = child_node.get(caption_property, child_node.get("name", node_label))
+                    node_data = {
+                        "id": unique_child_id, # <-- The synthetic ID
+                        "label": node_label,
+                        "name": caption,
+                        "original_element_id": child_node.element_id # Store real ID
+                    }
+                    if node_size_prop and child_node.get(node_size_prop) is not None:
+                        node_data["size"] = child_node.get(node_size_prop)
+
+                    nodes[unique_child_id] = {"data": node_data}
+
+                # Add the NEW EDGE
+                if edge_id not in edges:
+                    edge_data = { 
+                        "id": edge_id, 
+                        "source": parent_id, # <-- Parent's synthetic ID
+                        "target": unique_child_id, # <-- Child's synthetic ID
+                        "label": rel_type
+                    }
+                    # Only stored relationships keep their element ID; virtual ones change on every run.
+                    if ":" in record_rel.element_id:
+                        edge_data["original_element_id"] = record_rel.element_id
+                    if edge_weight_prop and record_rel.get(edge_weight_prop) is not None:
+                        edge_data["weight"] = record_rel.get(edge_weight_prop)
+                    edges[edge_id] = {"data": edge_data}
+
+    compound_nodes = [{"data": {"id": pid}} for pid in parent_nodes]
+    return list(nodes.values()) + list(edges.values()) + compound_nodes
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--nodes", type=int, default=50_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    builder = GraphBuilder(MAPPING, CAPTION)
+    for query_type, records, clicked in (
+        ("primary", make_primary_records(args.nodes), None),
+        ("neighbors", make_neighbor_records(args.nodes), "4:bench:parent"),
+    ):
+        expected = legacy_build(records, MAPPING, CAPTION, query_type, clicked)
+        assert builder.build(records, query_type, clicked) == expected, f"{query_type} output differs"
+        print(f"{query_type}: {len(records)} records -> {len(expected)} elements (best of {args.repeat})")
+        legacy = timed("  legacy _nodes_to_cytoscape_format", lambda: legacy_build(records, MAPPING, CAPTION, query_type, clicked), args.repeat)
+        fast = timed("  GraphBuilder.build", lambda: builder.build(records, query_type, clicked), args.repeat)
+        print(f"  {'speedup':<38} {legacy / fast:10.1f}x")
+
+if __name__ == "__main__":
+    main()
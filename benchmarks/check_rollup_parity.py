@@ -0,0 +1,124 @@
+"""
+Checks that the rollup engine (app/rollup.py) returns the same results as
+the Cypher queries of a rollup-capable query set, against the Neo4j
+instance configured in .env, and times both paths. Compares the primary
+query and table (first and second page), and the neighbor drill-down from
+the top clients down to the last level, one level at a time and three
+levels at once.
+
+    python -m benchmarks.check_rollup_parity --months 1,3,12 --clients 3
+
+Exits with status 1 if any comparison differs. Numbers are compared as
+floats rounded to 6 decimals; neighbor rows are compared in any order.
+"""
+import argparse
+import asyncio
+import sys
+import time
+import orjson
+from app import db
+from app.config import settings
+from app.query_registry import get_registry
+from app.repository import GraphRepository
+from app.rollup import get_rollup_engine
+
+def _normalize(value):
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return round(float(value), 6)
+    if isinstance(value, dict):
+        return {k: _normalize(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_normalize(v) for v in value]
+    return value
+
+class ParityCheck:
+    def __init__(self, driver, query_set: str):
+        self.query_set = query_set
+        self.cypher = GraphRepository(driver)
+        self.cypher.rollup = None
+        self.rollup = GraphRepository(driver)
+        self.failures = 0
+
+    async def compare(self, name: str, call, params: dict, ordered: bool = True) -> dict:
+        """Runs `call(repo, params)` on both paths, prints the outcome and returns the Cypher payload."""
+        start = time.perf_counter()
+        expected = await call(self.cypher, dict(params))
+        cypher_ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        actual = await call(self.rollup, dict(params))
+        rollup_ms = (time.perf_counter() - start) * 1000
+
+        rows = [_normalize(r) for r in expected["records"]], [_normalize(r) for r in actual["records"]]
+        if not ordered:
+            rows = tuple(sorted(r, key=lambda row: orjson.dumps(row, option=orjson.OPT_SORT_KEYS)) for r in rows)
+        same = rows[0] == rows[1]
+        self.failures += not same
+        print(f"{'ok  ' if same else 'DIFF'} {name:<48} {len(rows[0]):>7} rows  cypher {cypher_ms:9.1f} ms  rollup {rollup_ms:9.1f} ms")
+        if not same:
+            missing = [r for r in rows[0] if r not in rows[1]][:3]
+            extra = [r for r in rows[1] if r not in rows[0]][:3]
+            print(f"     cypher only: {missing}\n     rollup only: {extra}")
+        return expected
+
+    async def graph(self, repo: GraphRepository, params: dict) -> dict:
+        query_type = params.pop("query_type")
+        return await repo.execute_query(self.query_set, query_type, params)
+
+    async def table(self, repo: GraphRepository, params: dict) -> dict:
+        return await repo.execute_table_query(repo.get_table_query(self.query_set), params, self.query_set)
+
+    async def run(self, months: int, clients: int, limit: int):
+        base = {"months": months, "limit": limit, "text_search": None}
+        primary = await self.compare(f"primary months={months}", self.graph, {**base, "query_type": "primary"})
+        if primary.get("next_cursor"):
+            await self.compare(f"primary months={months} page 2", self.graph,
+                               {**base, "query_type": "primary", "cursor": primary["next_cursor"]})
+        table = await self.compare(f"table months={months}", self.table, base)
+        if table.get("next_cursor"):
+            await self.compare(f"table months={months} page 2", self.table, {**base, "cursor": table["next_cursor"]})
+
+        for node in [e["data"] for e in primary["graph"] if "source" not in e["data"]][:clients]:
+            params = {"months": months, "node_id": node["id"], "node_type": node["label"]}
+            await self.compare(f"neighbors depth=3 {node['id']}", self.graph,
+                               {**params, "query_type": "neighbors", "depth": 3}, ordered=False)
+            history = {}
+            while True:
+                payload = await self.compare(f"neighbors {params['node_type']} {params['node_id'].split('_')[-1]}", self.graph,
+                                             {**params, **history, "query_type": "neighbors"}, ordered=False)
+                children = sorted((e["data"] for e in payload["graph"]
+                                   if "source" not in e["data"] and e["data"]["id"] != params["node_id"]),
+                                  key=lambda data: data["original_element_id"])
+                if not children:
+                    break
+                history[f"{params['node_type']}_node_id"] = params["node_id"].split("_")[-1]
+                params = {"months": months, "node_id": children[0]["id"], "node_type": children[0]["label"]}
+
+async def main_async(args) -> int:
+    settings.cache_enabled = False
+    settings.rollup_enabled = True
+    snapshot = get_registry().load()
+    if not snapshot.query_sets.get(args.query_set, {}).get("rollup"):
+        print(f"Query set '{args.query_set}' is not marked `rollup: true` in {settings.queries_file_path}.")
+        return 1
+    driver = await db.get_driver()
+    try:
+        await get_rollup_engine().load(driver)
+        print(get_rollup_engine().stats())
+        check = ParityCheck(driver, args.query_set)
+        for months in (int(m) for m in args.months.split(",")):
+            await check.run(months, args.clients, args.limit)
+    finally:
+        await db.close_driver()
+    print(f"{check.failures} difference(s).")
+    return 1 if check.failures else 0
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--query-set", default="client_360_view")
+    parser.add_argument("--months", default="1,3,12", help="comma-separated month windows")
+    parser.add_argument("--clients", type=int, default=3, help="top clients to drill down from")
+    parser.add_argument("--limit", type=int, default=50, help="rows per primary and table page")
+    sys.exit(asyncio.run(main_async(parser.parse_args())))
+
+if __name__ == "__main__":
+    main()
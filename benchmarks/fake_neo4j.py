@@ -0,0 +1,208 @@
+"""
+A stand-in for the async Neo4j driver that answers the queries of a query
+set from queries.yaml with synthetic data, so the repository, serializers
+and endpoints can be benchmarked without a database.
+
+Queries are recognized by their text: the fake driver looks each one up in
+the query set it was built for (table, primary, per-label neighbor queries
+and their batched forms) and returns records of the same shape the real
+query returns, built from real `neo4j.graph.Node`/`Relationship` and
+`neo4j.Record` objects. The number of rows follows the query's `$limit`
+(primary, table; continuing after `$cursor_id` for later pages) or the
+driver's `fanout` (neighbors, per parent).
+
+Results are generated once per distinct query and parameters and then
+replayed, so repeated runs measure the application rather than the data
+generator.
+"""
+import os
+from typing import AsyncIterator, Iterable
+
+# app.config requires connection settings; the fake driver never uses them.
+os.environ.setdefault("NEO4J_URI", "bolt://localhost:7687")
+os.environ.setdefault("NEO4J_USER", "neo4j")
+os.environ.setdefault("NEO4J_PASSWORD", "benchmark")
+
+from neo4j import Record
+from neo4j.graph import Graph, Node
+from app.query_registry import QuerySnapshot, get_registry
+
+QUERY_SET = "client_360_view"
+
+# Drill-down chain of client_360_view: parent label -> (child label, parent column, child column).
+NEIGHBOR_SHAPES = {
+    "Client": ("DepositProduct", "c", "dp"),
+    "DepositProduct": ("Flow", "dp", "f"),
+    "Flow": ("PaymentProduct", "f", "pp"),
+    "PaymentProduct": ("FinancialInstitution", "pp", "fi"),
+    "FinancialInstitution": ("Prospect", "fi", "p"),
+}
+TABLE_KEYS = ["Client", "DepProduct", "Flow", "PayProduct", "FI", "Prospect", "Month", "totalAmount", "txCount", "_row_id"]
+
+class SyntheticGraph:
+    """Creates nodes, aggregate relationships and overlays shaped like the client_360_view data."""
+
+    def __init__(self):
+        self.graph = Graph()
+        self.rel_type = self.graph.relationship_type("AGG_TO")
+        self._nodes: dict[str, Node] = {}
+        self._next_id = 0
+
+    def node(self, label: str, index: int | str) -> Node:
+        element_id = f"4:bench:{label}{index}"
+        node = self._nodes.get(element_id)
+        if node is None:
+            node = self._nodes[element_id] = self._make_node(element_id, label, f"{label} {index}")
+        return node
+
+    def node_by_id(self, element_id: str, label: str) -> Node:
+        node = self._nodes.get(element_id)
+        if node is None:
+            node = self._nodes[element_id] = self._make_node(element_id, label, element_id)
+        return node
+
+    def _make_node(self, element_id: str, label: str, name: str) -> Node:
+        self._next_id += 1
+        properties = {"name": name}
+        if label == "Flow":
+            properties["direction"] = name
+        return Node(self.graph, element_id, self._next_id, [label], properties)
+
+    def relationship(self, parent: Node, child: Node, total: float, count: int):
+        self._next_id += 1
+        rel = self.rel_type(self.graph, f"5:bench:{self._next_id}", self._next_id, {"totalAmount": total, "txCount": count})
+        rel._start_node, rel._end_node = parent, child
+        return rel
+
+    @staticmethod
+    def overlay(name: str, total: float, count: int) -> dict:
+        return {"totalAmount": total, "txCount": count, "display_name": f"{name} ({count} txns, ${total:,.2f})"}
+
+    @staticmethod
+    def _start_after(cursor_id: str | None, label: str) -> int:
+        """The row index following a keyset cursor; rows are ordered by index."""
+        return int(cursor_id.rsplit(label, 1)[1]) + 1 if cursor_id else 0
+
+    def primary(self, limit: int, cursor_id: str | None = None) -> tuple[list[str], list[tuple]]:
+        rows = []
+        start = self._start_after(cursor_id, "Client")
+        for i in range(start, start + limit):
+            node = self.node("Client", i)
+            total, count = (10 ** 9 - i) * 0.125, i % 97 + 1
+            rows.append((node, self.overlay(node["name"], total, count)))
+        return ["n", "overlay"], rows
+
+    def table(self, limit: int, cursor_id: str | None = None) -> tuple[list[str], list[tuple]]:
+        start = self._start_after(cursor_id, "AggTx")
+        rows = [
+            (f"Client {i % 1000}", f"DepositProduct {i % 7}", ("IN", "OUT")[i % 2], f"PaymentProduct {i % 5}",
+             f"FinancialInstitution {i % 50}", f"Prospect {i}", f"2025-{i % 12 + 1:02d}", (10 ** 9 - i) * 0.125, i % 97 + 1,
+             f"4:bench:AggTx{i}")
+            for i in range(start, start + limit)
+        ]
+        return list(TABLE_KEYS), rows
+
+    def neighbors(self, label: str, parents: Iterable[tuple[str | None, str]], fanout: int) -> tuple[list[str], list[tuple]]:
+        """Children of every (synthetic parent ID or None, parent element ID); with a synthetic ID, a leading __parent column is added."""
+        child_label, parent_key, child_key = NEIGHBOR_SHAPES.get(label, NEIGHBOR_SHAPES["Client"])
+        parent_label = label if label in NEIGHBOR_SHAPES else "Client"
+        batched, rows = False, []
+        for synthetic_id, parent_id in parents:
+            parent = self.node_by_id(parent_id, parent_label)
+            for j in range(fanout):
+                child = self.node(child_label, j)
+                total, count = (fanout - j) * 42.5, j % 31 + 1
+                rel = self.relationship(parent, child, total, count)
+                row = (parent, rel, child, self.overlay(child["name"], total, count))
+                if synthetic_id is not None:
+                    batched, row = True, (synthetic_id,) + row
+                rows.append(row)
+        keys = [parent_key, "rel", child_key, "overlay"]
+        return (["__parent"] + keys if batched else keys), rows
+
+class FakeResult:
+    def __init__(self, keys: list[str], rows: list[tuple]):
+        self._keys = keys
+        self._rows = rows
+
+    def keys(self) -> list[str]:
+        return self._keys
+
+    async def __aiter__(self) -> AsyncIterator[Record]:
+        keys = self._keys
+        for row in self._rows:
+            yield Record(zip(keys, row))
+
+    async def consume(self):
+        return None
+
+class FakeSession:
+    def __init__(self, driver: "FakeDriver"):
+        self.driver = driver
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def run(self, query: str, parameters: dict | None = None, **kwargs) -> FakeResult:
+        return FakeResult(*self.driver.answer(query, parameters or {}))
+
+    async def execute_read(self, work, *args, **kwargs):
+        # The session doubles as the transaction: both expose run().
+        return await work(self, *args, **kwargs)
+
+class FakeDriver:
+    """
+    Answers the queries of one query set with synthetic results.
+
+    `fanout` is the number of children each neighbor query returns per
+    parent node.
+    """
+
+    def __init__(self, fanout: int = 10, query_set: str = QUERY_SET, snapshot: QuerySnapshot | None = None):
+        self.fanout = fanout
+        self.data = SyntheticGraph()
+        self.queries = 0
+        snapshot = snapshot or get_registry().current()
+        details = snapshot.query_sets[query_set]
+        self._kinds: dict[str, tuple[str, str | None]] = {
+            details["primary"]: ("primary", None),
+            details["table_query"]: ("table", None),
+        }
+        for label, query in details.get("neighbors", {}).items():
+            self._kinds[query] = ("neighbors", label)
+        for label, query in snapshot.batched_neighbors.get(query_set, {}).items():
+            if query is not None:
+                self._kinds[query] = ("batched", label)
+        self._replay: dict[tuple, tuple[list[str], list[tuple]]] = {}
+
+    def session(self, **kwargs) -> FakeSession:
+        return FakeSession(self)
+
+    async def close(self):
+        pass
+
+    def answer(self, query: str, params: dict) -> tuple[list[str], list[tuple]]:
+        self.queries += 1
+        key = (query, repr(sorted(params.items())))
+        answer = self._replay.get(key)
+        if answer is None:
+            answer = self._replay[key] = self._generate(query, params)
+        return answer
+
+    def _generate(self, query: str, params: dict) -> tuple[list[str], list[tuple]]:
+        kind, label = self._kinds.get(query, (None, None))
+        if kind == "primary":
+            return self.data.primary(int(params["limit"]), params.get("cursor_id"))
+        if kind == "table":
+            return self.data.table(int(params["limit"]), params.get("cursor_id"))
+        if kind == "neighbors":
+            return self.data.neighbors(label, [(None, params["node_id"])], self.fanout)
+        if kind == "batched":
+            return self.data.neighbors(label, [(row["__parent"], row["node_id"]) for row in params["__rows"]], self.fanout)
+        if "UNWIND $ids" in query:
+            return ["id", "props"], [(element_id, {"name": element_id}) for element_id in params["ids"]]
+        # Anything else (e.g. the pool warm-up ping) gets an empty result.
+        return [], []
@@ -0,0 +1,75 @@
+"""Timing and reporting helpers shared by the benchmark modules."""
+import json
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from typing import Callable
+
+def timed(label: str, fn, repeat: int) -> float:
+    """Prints and returns the best wall time of `repeat` runs of fn."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    print(f"{label:<40} {best * 1000:10.1f} ms")
+    return best
+
+@dataclass
+class Result:
+    scenario: str
+    records: int
+    iterations: int
+    p50_ms: float
+    p99_ms: float
+    records_per_s: float
+    peak_mb: float
+
+def _percentile(sorted_values: list[float], fraction: float) -> float:
+    index = min(len(sorted_values) - 1, round(fraction * (len(sorted_values) - 1)))
+    return sorted_values[index]
+
+def measure(scenario: str, records: int, fn: Callable[[], object], iterations: int) -> Result:
+    """
+    Runs fn once to warm up, `iterations` times for latency, and once more
+    under tracemalloc for peak memory (tracing slows allocation down, so it
+    is kept out of the timed runs). Throughput is records per second at the
+    median latency.
+    """
+    fn()
+    latencies = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+
+    tracemalloc.start()
+    try:
+        fn()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    p50 = _percentile(latencies, 0.5)
+    return Result(
+        scenario=scenario,
+        records=records,
+        iterations=iterations,
+        p50_ms=p50 * 1000,
+        p99_ms=_percentile(latencies, 0.99) * 1000,
+        records_per_s=records / p50 if p50 else float("inf"),
+        peak_mb=peak / (1024 * 1024),
+    )
+
+def print_results(results: list[Result]) -> None:
+    print(f"{'scenario':<34} {'records':>9} {'p50 ms':>10} {'p99 ms':>10} {'records/s':>12} {'peak MB':>9}")
+    for r in results:
+        print(f"{r.scenario:<34} {r.records:>9} {r.p50_ms:>10.1f} {r.p99_ms:>10.1f} {r.records_per_s:>12,.0f} {r.peak_mb:>9.1f}")
+
+def write_results(results: list[Result], path: str) -> None:
+    """Writes results as JSON, so a run can be committed and diffed in review."""
+    with open(path, "w") as file:
+        rows = [{k: round(v, 2) if isinstance(v, float) else v for k, v in asdict(r).items()} for r in results]
+        json.dump(rows, file, indent=2)
+        file.write("\n")